@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+"""Synthetic Calendar Generator
+
+This script writes a Google calendar style file (.ics) of made up CATS tutor meetings
+for benchmarking. The same seed and arguments always produce the same calendar, so
+timings taken on different machines or revisions are of the same input.
+
+The calendar can be shaped with:
+	* the number of VEVENTs written, including overrides and noise events
+	* the share of meetings that recur weekly, and how many times they recur
+	* the number of EXDATE exclusions of each recurring meeting
+	* the share of recurring meetings with an occurrence moved by a RECURRENCE-ID override
+	* the share of events with long, folded DESCRIPTION and SUMMARY lines
+	* the share of non-CATS "noise" events, whose summaries aren't formatted as:
+		tutorLastName-studentLastName-Course-Sport
+
+A later export of the same calendar is made with a higher revision, in which a share
+of the events have a new SEQUENCE and LAST-MODIFIED while the rest are unchanged.
+
+command line usage:
+	python3 icsGenerator.py outFile -n [numEvents] --seed [seed] -s [startDate]
+	- where outFile is the (.ics) file to write
+	- [numEvents] is the number of VEVENTs, 1000 by default
+	- [startDate] is the date of the earliest meeting, formatted as: MM/DD/YYYY
+	- see --help for the remaining options
+
+If imported as a module, the following functions are available:
+	* generateCalendar - given an output file name and options, writes a synthetic calendar
+"""
+
+import random
+import argparse
+from datetime import datetime, date, timedelta
+
+STUDENTS = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+	'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas']
+COURSES = ['MA 113', 'MA 114', 'CHE 105', 'PHY 211', 'BIO 148', 'STA 296', 'ECO 201', 'CS 115']
+SPORTS = ['Football', 'W Soccer', 'M Soccer', 'W Basketball', 'M Basketball', 'Baseball', 'Softball', 'Track']
+NOISE = ['Dentist', 'Team meeting', 'Office hours', 'Lunch with Sam', 'Study group', 'Gym', 'Advising']
+DESCRIPTION = "Session notes: review homework problems, go over the last exam and plan the next study session. "
+
+def generateCalendar(outFile, numEvents=1000, seed=0, start=date(2021, 8, 23), tutor='Doe',
+		recurringRatio=0.5, maxWeeks=16, exdates=1, overrideRatio=0.1, foldRatio=0.2,
+		noiseRatio=0.2, revision=0, changedRatio=0.1):
+	"""Given an output file name and options, writes a synthetic calendar (.ics) file
+
+	Parameters
+	~~~~~~~~~~
+	outFile : str
+		The (.ics) file to write
+	numEvents : int, optional
+		The number of VEVENTs written, including overrides and noise events
+	seed : int, optional
+		The seed of the random choices; the same seed gives the same calendar
+	start : date, optional
+		The date of the earliest meeting
+	tutor : str, optional
+		The tutor's last name used in meeting summaries
+	recurringRatio : float, optional
+		The share of meetings recurring weekly
+	maxWeeks : int, optional
+		The most times a recurring meeting occurs, also the number of weeks meetings span
+	exdates : int, optional
+		The number of EXDATE exclusions of each recurring meeting
+	overrideRatio : float, optional
+		The share of recurring meetings with one occurrence moved by a RECURRENCE-ID override
+	foldRatio : float, optional
+		The share of events with long lines folded onto continuation lines
+	noiseRatio : float, optional
+		The share of events that aren't CATS tutor meetings
+	revision : int, optional
+		0 for the first export; higher for later exports of the same calendar
+	changedRatio : float, optional
+		The share of events changed in each later revision
+
+	Returns
+	~~~~~~~
+	dict
+		Counts of the events written: events, recurring, overrides, noise, changed
+	"""
+	rng = random.Random(seed)
+	changeRng = random.Random(seed*7919 + revision) # kept apart so revisions share the same events
+	counts = {'events': 0, 'recurring': 0, 'overrides': 0, 'noise': 0, 'changed': 0}
+	stampBase = datetime(start.year, start.month, start.day) - timedelta(days=30)
+	origin = datetime(start.year, start.month, start.day)
+
+	with open(outFile, 'w', encoding='utf-8', newline='') as ics:
+		ics.write('BEGIN:VCALENDAR\r\nPRODID:-//CATStutorTools//benchmarks//EN\r\nVERSION:2.0\r\n'
+			'CALSCALE:GREGORIAN\r\nX-WR-TIMEZONE:America/New_York\r\n')
+		num = 0
+		while counts['events'] < numEvents:
+			num += 1
+			uid = 'bench%d-%d@catstutortools' % (seed, num)
+			dtStart = origin + timedelta(days=rng.randrange(7), hours=rng.randrange(8, 19),
+				minutes=rng.choice([0, 15, 30, 45]))
+			length = timedelta(minutes=rng.choice([30, 60, 60, 90, 120]))
+			if rng.random() < noiseRatio:
+				summary = rng.choice(NOISE)
+				counts['noise'] += 1
+			else:
+				summary = '-'.join([tutor, rng.choice(STUDENTS), rng.choice(COURSES), rng.choice(SPORTS)])
+			folded = rng.random() < foldRatio
+			recurring = rng.random() < recurringRatio
+			weeks = rng.randrange(2, maxWeeks+1) if recurring else 1
+			if not recurring:
+				dtStart += timedelta(weeks=rng.randrange(maxWeeks))
+			excluded = sorted(rng.sample(range(1, weeks), min(exdates, weeks-1))) if recurring else []
+			moved = None
+			if recurring and rng.random() < overrideRatio:
+				moved = rng.randrange(weeks)
+
+			sequence, lastMod = 0, stampBase
+			if revision and changeRng.random() < changedRatio:
+				sequence, lastMod = revision, stampBase + timedelta(days=revision)
+				counts['changed'] += 1
+
+			lines = ['UID:'+uid, 'DTSTART;TZID=America/New_York:'+_icsTime(dtStart),
+				'DTEND;TZID=America/New_York:'+_icsTime(dtStart+length)]
+			if recurring:
+				if rng.random() < 0.5:
+					lines.append('RRULE:FREQ=WEEKLY;COUNT=%d' % weeks)
+				else:
+					until = dtStart + timedelta(weeks=weeks-1)
+					lines.append('RRULE:FREQ=WEEKLY;WKST=SU;UNTIL=%sZ;BYDAY=%s' % (_icsTime(until), _byDay(dtStart)))
+				for week in excluded:
+					lines.append('EXDATE;TZID=America/New_York:'+_icsTime(dtStart+timedelta(weeks=week)))
+				counts['recurring'] += 1
+			lines += _commonLines(summary, sequence, lastMod, folded)
+			_writeEvent(ics, lines, folded)
+			counts['events'] += 1
+
+			if moved is not None and counts['events'] < numEvents:
+				original = dtStart + timedelta(weeks=moved)
+				newStart = original + timedelta(days=1, hours=rng.choice([-1, 0, 1]))
+				lines = ['UID:'+uid, 'RECURRENCE-ID;TZID=America/New_York:'+_icsTime(original),
+					'DTSTART;TZID=America/New_York:'+_icsTime(newStart),
+					'DTEND;TZID=America/New_York:'+_icsTime(newStart+length)]
+				lines += _commonLines(summary, sequence+1, lastMod, folded)
+				_writeEvent(ics, lines, folded)
+				counts['events'] += 1
+				counts['overrides'] += 1
+		ics.write('END:VCALENDAR\r\n')
+	return counts
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _commonLines(summary, sequence, lastMod, folded):
+	"""returns the lines shared by a meeting and its overrides"""
+	lines = ['DTSTAMP:'+_icsTime(lastMod)+'Z', 'CREATED:'+_icsTime(lastMod)+'Z',
+		'LAST-MODIFIED:'+_icsTime(lastMod)+'Z', 'SEQUENCE:%d' % sequence,
+		'STATUS:CONFIRMED', 'SUMMARY:'+summary, 'TRANSP:OPAQUE']
+	if folded:
+		lines.insert(4, 'DESCRIPTION:'+DESCRIPTION*3)
+		lines.append('LOCATION:CATS Study Hall\\, Gatton Student-Athlete Academic Enrichment Center\\, Room 104')
+	return lines
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _writeEvent(ics, lines, folded):
+	"""writes a VEVENT, with a reminder, folding lines longer than 75 characters if folded"""
+	ics.write('BEGIN:VEVENT\r\n')
+	for line in lines:
+		if folded and len(line) > 75:
+			ics.write(line[:75]+'\r\n')
+			for i in range(75, len(line), 74):
+				ics.write(' '+line[i:i+74]+'\r\n')
+		else:
+			ics.write(line+'\r\n')
+	ics.write('BEGIN:VALARM\r\nACTION:DISPLAY\r\nDESCRIPTION:This is an event reminder\r\n'
+		'TRIGGER:-P0DT0H10M0S\r\nEND:VALARM\r\nEND:VEVENT\r\n')
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _icsTime(dt):
+	"""returns a datetime formatted as an (.ics) date-time value without timezone"""
+	return dt.strftime('%Y%m%dT%H%M%S')
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _byDay(dt):
+	"""returns the two letter RRULE day of a datetime"""
+	return ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU'][dt.weekday()]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument("outFile", type=str, help="The (.ics) file to write")
+	argParser.add_argument("-n", "--numEvents", type=int, default=1000, help="The number of VEVENTs to write")
+	argParser.add_argument("--seed", type=int, default=0, help="The seed of the random choices")
+	argParser.add_argument("-s", "--startDate", type=str, default="08/23/2021",
+		help="The date of the earliest meeting, formatted as: MM/DD/YYYY")
+	argParser.add_argument("--recurring", type=float, default=0.5, help="The share of meetings recurring weekly")
+	argParser.add_argument("--weeks", type=int, default=16, help="The most times a recurring meeting occurs")
+	argParser.add_argument("--exdates", type=int, default=1, help="The number of EXDATEs of each recurring meeting")
+	argParser.add_argument("--overrides", type=float, default=0.1, help="The share of recurring meetings with a moved occurrence")
+	argParser.add_argument("--folded", type=float, default=0.2, help="The share of events with folded lines")
+	argParser.add_argument("--noise", type=float, default=0.2, help="The share of events that aren't CATS meetings")
+	argParser.add_argument("--revision", type=int, default=0, help="0 for the first export, higher for later exports")
+	argParser.add_argument("--changed", type=float, default=0.1, help="The share of events changed in each later revision")
+	args = argParser.parse_args()
+
+	counts = generateCalendar(args.outFile, args.numEvents, args.seed, datetime.strptime(args.startDate, '%m/%d/%Y').date(),
+		recurringRatio=args.recurring, maxWeeks=args.weeks, exdates=args.exdates, overrideRatio=args.overrides,
+		foldRatio=args.folded, noiseRatio=args.noise, revision=args.revision, changedRatio=args.changed)
+	print("Output file created: ", args.outFile, counts)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""CATStutorTools Recurrence Rule Check
+
+This script checks that the arithmetic expansion of simple recurrence rules
+(simpleRule.py) gives exactly the occurrences dateutil does. It builds a corpus of
+random DAILY and WEEKLY rules of the shapes tutoring meetings use, with and without
+INTERVAL, BYDAY, WKST, UNTIL (with and without a time) and COUNT, and compares the
+occurrences of each within random windows, as expanded by calendar2csv.expandWindow.
+Rules the fast path leaves to dateutil are counted but not compared.
+
+command line usage:
+	python3 ruleCheck.py -n [numRules] --seed [seed]
+	- [numRules] is the number of random rules checked, 20000 by default
+	- [seed] is the seed of the random rules, 0 by default
+
+The script exits with an error on the first rule whose occurrences differ, printing
+the rule and window.
+"""
+
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'timesheetGen', 'source'))
+
+from calendar2csv import expandWindow
+from simpleRule import parseSimpleRule, WEEKDAYS
+
+FIRST_START = datetime(2019, 1, 1)
+
+def ruleCheck(numRules=20000, seed=0):
+	"""Given the number of rules and a seed, compares the fast and dateutil expansions of random rules
+
+	Returns
+	~~~~~~~
+	tuple
+		(rules compared, rules left to dateutil), or None after printing the first mismatch
+	"""
+	from dateutil import rrule
+	rand = random.Random(seed)
+	compared, fallback = 0, 0
+	for num in range(numRules):
+		start, ruleText = _randomRule(rand)
+		fast = parseSimpleRule(start, ruleText)
+		if fast is None:
+			fallback += 1
+			continue
+		slow = rrule.rrulestr(ruleText, dtstart=start)
+		for window in range(3):
+			windowStart = start + timedelta(days=rand.randint(-60, 400), minutes=rand.choice([0, rand.randint(0, 1439)]))
+			windowEnd = windowStart + timedelta(days=rand.choice([0, 6, 13, 30, 120, 800]), hours=rand.randint(0, 23))
+			expected = expandWindow(slow, windowStart, windowEnd, budget=100000)
+			occurrences = expandWindow(fast, windowStart, windowEnd, budget=100000)
+			if not occurrences == expected:
+				print("MISMATCH: DTSTART", start, "RRULE", ruleText)
+				print(" window:", windowStart, "to", windowEnd)
+				print(" dateutil:", expected[:10])
+				print(" simple:  ", occurrences[:10])
+				return None
+		# the whole expansion, for rules that end
+		if 'UNTIL' in ruleText or 'COUNT' in ruleText:
+			if not list(fast) == list(slow):
+				print("MISMATCH: DTSTART", start, "RRULE", ruleText, "over all occurrences")
+				return None
+		compared += 1
+	return compared, fallback
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _randomRule(rand):
+	"""returns a random (DTSTART, RRULE value) of the shapes meetings use, with a few exotic ones"""
+	start = FIRST_START + timedelta(days=rand.randint(0, 1500), minutes=15*rand.randint(28, 84))
+	parts = []
+	freq = rand.choice(['WEEKLY', 'WEEKLY', 'WEEKLY', 'DAILY', 'MONTHLY'])
+	parts.append('FREQ='+freq)
+	if rand.random() < 0.3:
+		parts.append('INTERVAL=%d' % rand.randint(1, 4))
+	if rand.random() < 0.5:
+		parts.append('WKST='+rand.choice(list(WEEKDAYS)))
+	if freq == 'WEEKLY' and rand.random() < 0.8:
+		days = rand.sample(list(WEEKDAYS), rand.randint(1, 3))
+		if rand.random() < 0.02:
+			days[0] = '1'+days[0] # a numeric prefix, left to dateutil
+		parts.append('BYDAY='+','.join(days))
+	end = rand.random()
+	if end < 0.45:
+		until = start + timedelta(days=rand.randint(-3, 300))
+		if rand.random() < 0.4:
+			parts.append('UNTIL='+until.strftime('%Y%m%d')) # a date alone is midnight
+		else:
+			until = until.replace(hour=rand.randint(0, 23), minute=rand.choice([0, 15, 30, 45]))
+			parts.append('UNTIL='+until.strftime('%Y%m%dT%H%M%S'))
+	elif end < 0.8:
+		parts.append('COUNT=%d' % rand.randint(1, 40))
+	rand.shuffle(parts)
+	return start, ';'.join(parts)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument("-n", "--numRules", type=int, default=20000, help="The number of random rules checked")
+	argParser.add_argument("--seed", type=int, default=0, help="The seed of the random rules")
+	args = argParser.parse_args()
+
+	checked = ruleCheck(args.numRules, args.seed)
+	if checked is None:
+		sys.exit(1)
+	print("Rules with identical occurrences: ", checked[0])
+	print("Rules left to dateutil: ", checked[1])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,330 @@
+#!/usr/bin/python3
+"""CATStutorTools Benchmarks
+
+This script times the stages of the tools on synthetic calendars (see icsGenerator.py)
+of increasing size, and saves the timings to a (.json) file that can be compared with
+the timings of an earlier run.
+
+The benchmarks are:
+	* parse - tokenizing the calendar into meetings, calendar2csv.parseCalendar()
+	* scan - indexing the memory-mapped calendar and decoding only the events that could
+	  fall within the window, calendar2csv.scanCalendar()
+	* sessions - parsing and expanding the meetings of the window into sessions,
+	  calendar2csv.calendar2sessions() without the cache
+	* expand - the part of sessions not spent in parse
+	* reingest - parsing a later export of the calendar, in which some events changed,
+	  carrying the unchanged events over from the first parse
+	* reconcile - the 'reconcile' stage of calendar2csv.calendar2sessions(), indexing the
+	  occurrences moved by RECURRENCE-ID overrides, on a calendar of the same size in which
+	  every meeting recurs and has a moved occurrence
+	* render - writing the timesheet (.docx) of the sessions, csv2timesheet.sessions2timesheet()
+	* renderStream - the same with the streaming writer
+	* js - generating the report form filler Javascript, repFormFiller.repFormFiller()
+
+The window covers every meeting of the synthetic calendar. Rendering is limited to the
+first [renderLimit] sessions, since a timesheet of millions of rows isn't realistic.
+A benchmark whose requirements aren't installed (such as python-docx for render) is
+recorded as skipped.
+
+command line usage:
+	python3 runBenchmarks.py -n [sizes] -r [repeat] -o [outFile] -b [baseline]
+	- [sizes] are the numbers of VEVENTs of each calendar, 100 1000 10000 by default,
+	  and may go up to 1000000
+	- [repeat] is the number of times each benchmark is run, keeping the fastest
+	- [outFile] is the (.json) file the timings are saved to, benchResults.json by default
+	- [baseline] is an optional (.json) file from an earlier run to compare with; any
+	  benchmark slower than the baseline by more than --tolerance is reported, and the
+	  script exits with an error
+	- --only runs only the named benchmarks, e.g. --only parse reingest
+
+example use:
+	python3 runBenchmarks.py -o before.json
+	(make changes)
+	python3 runBenchmarks.py -o after.json -b before.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from icsGenerator import generateCalendar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIRS = [os.path.join(ROOT, 'timesheetGen', 'source'), os.path.join(ROOT, 'repFormFiller', 'source')]
+TEMPLATE = os.path.join(ROOT, 'timesheetGen', 'timesheetTemplate.docx')
+BENCHMARKS = ['parse', 'scan', 'sessions', 'reingest', 'reconcile', 'render', 'renderStream', 'js']
+RESULTS_VERSION = 2 # 2: 'reconcile' times the reconcile stage, the re-ingest was renamed 'reingest'
+
+def runBenchmarks(sizes, repeat=3, seed=0, only=None, renderLimit=10000, workDir=None):
+	"""Given a list of calendar sizes, runs the benchmarks on a synthetic calendar of each size
+
+	Parameters
+	~~~~~~~~~~
+	sizes : list
+		The numbers of VEVENTs of the calendars
+	repeat : int, optional
+		The number of times each benchmark is run, the fastest being kept
+	seed : int, optional
+		The seed of the synthetic calendars
+	only : list, optional
+		The names of the benchmarks to run, all if not given
+	renderLimit : int, optional
+		The most sessions written to a timesheet by the render benchmarks
+	workDir : str, optional
+		The directory the calendars and outputs are written in, a temporary one if not given
+
+	Returns
+	~~~~~~~
+	dict
+		The results, as saved to the (.json) file
+	"""
+	benchmarks = only or BENCHMARKS
+	# meetings start 8 weeks before today so repFormFiller, which looks from today on, finds some
+	start = date.today() - timedelta(weeks=8)
+	results = {'version': RESULTS_VERSION, 'meta': _meta(seed, repeat, start), 'results': {}}
+	cleanup = workDir is None
+	if workDir is None:
+		workDir = tempfile.mkdtemp(prefix='catsBench')
+	os.makedirs(workDir, exist_ok=True)
+	prevDir = os.getcwd()
+	os.environ['CATS_CACHE_DIR'] = os.path.join(workDir, 'cache') # never touch the user's cache
+	for sourceDir in SOURCE_DIRS:
+		if sourceDir not in sys.path:
+			sys.path.append(sourceDir)
+	try:
+		os.chdir(workDir) # the tools write their outputs and read the template in the runpath
+		if os.path.exists(TEMPLATE):
+			shutil.copy(TEMPLATE, 'timesheetTemplate.docx')
+		for size in sizes:
+			print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+			print("Calendar of", size, "events")
+			_runSize(results['results'], benchmarks, size, seed, start, repeat, renderLimit)
+	finally:
+		os.chdir(prevDir)
+		if cleanup:
+			shutil.rmtree(workDir, ignore_errors=True)
+	return results
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _runSize(results, benchmarks, size, seed, start, repeat, renderLimit):
+	"""runs the chosen benchmarks on calendars of one size, adding their results"""
+	ics, icsChanged = 'bench_%d.ics' % size, 'bench_%d_changed.ics' % size
+	icsOverrides = 'bench_%d_overrides.ics' % size
+	counts = generateCalendar(ics, size, seed, start)
+	startDate = start.strftime('%m/%d/%Y')
+	endDate = (start + timedelta(weeks=20)).strftime('%m/%d/%Y')
+	state = {}
+
+	def record(name, timing, calendarCounts=counts):
+		timing.update(calendarCounts)
+		results.setdefault(name, {})[str(size)] = timing
+		if 'skipped' in timing:
+			print("  %-13s skipped: %s" % (name, timing['skipped']))
+		else:
+			print("  %-13s %10.4f s  (%s items)" % (name, timing['wall'], timing.get('items', '-')))
+
+	def needed(*names):
+		return any(name in benchmarks for name in names)
+
+	if needed('parse', 'sessions', 'reingest'):
+		record('parse', _bench(lambda: _parse(ics, state), repeat))
+	if needed('scan'):
+		record('scan', _bench(lambda: _scan(ics, start, start + timedelta(weeks=20)), repeat))
+	if needed('sessions', 'render', 'renderStream'):
+		record('sessions', _bench(lambda: _sessions(ics, startDate, endDate, state), repeat))
+		sessionsTiming = results['sessions'][str(size)]
+		parseTiming = results.get('parse', {}).get(str(size), {})
+		if 'wall' in sessionsTiming and 'wall' in parseTiming:
+			record('expand', {'wall': max(0.0, sessionsTiming['wall']-parseTiming['wall'])})
+	if needed('reingest'):
+		generateCalendar(icsChanged, size, seed, start, revision=1)
+		record('reingest', _bench(lambda: _reingest(icsChanged, state), repeat))
+	if needed('reconcile'):
+		overrideCounts = generateCalendar(icsOverrides, size, seed, start, recurringRatio=1.0, overrideRatio=1.0)
+		record('reconcile', _benchStage(lambda: _reconcile(icsOverrides, startDate, endDate), 'reconcile', repeat), overrideCounts)
+	if needed('render'):
+		record('render', _bench(lambda: _render(state, renderLimit, False), repeat))
+	if needed('renderStream'):
+		record('renderStream', _bench(lambda: _render(state, renderLimit, True), repeat))
+	if needed('js'):
+		record('js', _bench(lambda: _js(ics), repeat))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _bench(func, repeat):
+	"""runs func repeat times, returning the fastest and median wall times, fastest CPU time and item count
+
+	func returns the number of items it produced. A benchmark raising ImportError is skipped.
+	"""
+	walls, cpus, items = [], [], None
+	for run in range(repeat):
+		try:
+			wall0, cpu0 = time.perf_counter(), time.process_time()
+			items = func()
+			walls.append(time.perf_counter()-wall0)
+			cpus.append(time.process_time()-cpu0)
+		except ImportError as err:
+			return {'skipped': str(err)}
+		except _Skip as err:
+			return {'skipped': str(err)}
+	walls.sort()
+	return {'wall': walls[0], 'wallMedian': walls[len(walls)//2], 'cpu': min(cpus), 'items': items}
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _benchStage(func, stage, repeat):
+	"""runs func repeat times as _bench does, timing only the named stage (see stageTimer.py) of each run"""
+	walls, cpus, items = [], [], None
+	for run in range(repeat):
+		try:
+			from stageTimer import StageTimer, usingTimer
+			timer = StageTimer()
+			with usingTimer(timer):
+				items = func()
+		except ImportError as err:
+			return {'skipped': str(err)}
+		wall, cpu, calls = timer.stages.get(stage, [0.0, 0.0, 0])
+		walls.append(wall)
+		cpus.append(cpu)
+	walls.sort()
+	return {'wall': walls[0], 'wallMedian': walls[len(walls)//2], 'cpu': min(cpus), 'items': items}
+
+class _Skip(Exception):
+	"""raised by a benchmark that can't run because an earlier one didn't"""
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _parse(ics, state):
+	from calendar2csv import parseCalendar
+	state['meetings'] = parseCalendar(ics)
+	return len(state['meetings'])
+
+def _scan(ics, startDate, endDate):
+	from calendar2csv import scanCalendar
+	from icsIndex import clearIndexes
+	clearIndexes() # time a first scan, not one reusing the index
+	return len(scanCalendar(ics, startDate, endDate))
+
+def _sessions(ics, startDate, endDate, state):
+	from calendar2csv import calendar2sessions
+	state['sessions'] = calendar2sessions(ics, startDate, endDate, useCache=False)
+	return len(state['sessions'])
+
+def _reingest(ics, state):
+	from calendar2csv import parseCalendar
+	if 'meetings' not in state:
+		raise _Skip("parse didn't run")
+	return len(parseCalendar(ics, state['meetings']))
+
+def _reconcile(ics, startDate, endDate):
+	from calendar2csv import calendar2sessions
+	from stageTimer import currentTimer
+	calendar2sessions(ics, startDate, endDate, useCache=False)
+	return currentTimer().counts.get('overrides', 0)
+
+def _render(state, renderLimit, stream):
+	from csv2timesheet import sessions2timesheet
+	if 'sessions' not in state:
+		raise _Skip("sessions didn't run")
+	if not os.path.exists('timesheetTemplate.docx'):
+		raise _Skip("timesheetTemplate.docx not found")
+	sessions = state['sessions'][:renderLimit]
+	sessions2timesheet(sessions, outFile='bench_timesheet.docx', stream=stream)
+	return len(sessions)
+
+def _js(ics):
+	from repFormFiller import repFormFiller
+	from icsCache import clearCache
+	clearCache(os.environ['CATS_CACHE_DIR']) # time a first run, not a cached one
+	repFormFiller(ics)
+	return os.path.getsize('outputJS.js')
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _meta(seed, repeat, start):
+	"""returns a description of the machine and run saved with the results"""
+	return {
+		'python': platform.python_version(),
+		'implementation': platform.python_implementation(),
+		'platform': platform.platform(),
+		'machine': platform.machine(),
+		'cpus': os.cpu_count(),
+		'seed': seed,
+		'repeat': repeat,
+		'calendarStart': start.isoformat() if start is not None else None,
+		'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+	}
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def compareResults(results, baseline, tolerance=0.1):
+	"""Given results and baseline results, prints the change of each benchmark and returns the regressions
+
+	A benchmark regressed if its fastest wall time is more than (1 + tolerance) times the
+	baseline's. Benchmarks missing or skipped in either are not compared, nor is reconcile
+	with a baseline of version 1, in which it timed the re-ingest.
+	"""
+	regressions = []
+	print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+	print("%-13s %14s %12s %12s %8s" % ('benchmark', 'size', 'baseline', 'current', 'ratio'))
+	for name, bySize in sorted(results['results'].items()):
+		for size, timing in sorted(bySize.items(), key=_sizeKey):
+			base = baseline.get('results', {}).get(name, {}).get(size)
+			if name == 'reconcile' and baseline.get('version', 1) < 2:
+				base = None
+			if base is None or 'wall' not in base or 'wall' not in timing:
+				continue
+			ratio = timing['wall'] / base['wall'] if base['wall'] > 0 else float('inf')
+			flag = ''
+			if ratio > 1 + tolerance:
+				flag = '  SLOWER'
+				regressions.append((name, size, ratio))
+			print("%-13s %14s %12.4f %12.4f %8.2f%s" % (name, size, base['wall'], timing['wall'], ratio, flag))
+	return regressions
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _sizeKey(item):
+	"""sorts results numerically by size, or by name for results keyed by name (see startupBenchmark.py)"""
+	if item[0].isdigit():
+		return (0, int(item[0]), '')
+	return (1, 0, item[0])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument("-n", "--sizes", type=int, nargs='+', default=[100, 1000, 10000],
+		help="The numbers of VEVENTs of the synthetic calendars")
+	argParser.add_argument("-r", "--repeat", type=int, default=3, help="The number of runs of each benchmark")
+	argParser.add_argument("-o", "--outFile", type=str, default='benchResults.json',
+		help="The (.json) file to save the timings to")
+	argParser.add_argument("-b", "--baseline", type=str, default=None,
+		help="A (.json) file of earlier timings to compare with")
+	argParser.add_argument("--tolerance", type=float, default=0.1,
+		help="The fraction a benchmark may be slower than the baseline before it is reported")
+	argParser.add_argument("--seed", type=int, default=0, help="The seed of the synthetic calendars")
+	argParser.add_argument("--only", type=str, nargs='+', choices=BENCHMARKS, default=None,
+		help="Run only the named benchmarks")
+	argParser.add_argument("--renderLimit", type=int, default=10000,
+		help="The most sessions written to a timesheet by the render benchmarks")
+	argParser.add_argument("--workDir", type=str, default=None,
+		help="Keep the calendars and outputs in this directory instead of a temporary one")
+	args = argParser.parse_args()
+
+	outFile = os.path.abspath(args.outFile)
+	results = runBenchmarks(args.sizes, args.repeat, args.seed, args.only, args.renderLimit, args.workDir)
+	with open(outFile, 'w') as out:
+		json.dump(results, out, indent=1, sort_keys=True)
+	print("Output file created: ", outFile)
+
+	if args.baseline is not None:
+		with open(args.baseline, 'r') as base:
+			baseline = json.load(base)
+		regressions = compareResults(results, baseline, args.tolerance)
+		if regressions:
+			print("Benchmarks slower than the baseline: ", len(regressions))
+			sys.exit(1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+"""CATStutorTools Startup Benchmark
+
+This script measures how long the tools take to start: the wall time of running each
+command line tool with --help in a new interpreter, and the time spent importing
+modules before it can do anything, as reported by:
+	python -X importtime
+The slowest imports of each tool are listed, so a module that makes startup slow can
+be found and deferred.
+
+Each entry point is held to a budget in milliseconds, and the timings are saved to a
+(.json) file in the same format as runBenchmarks.py so they can be compared with an
+earlier run in the same way.
+
+The entry points are:
+	* timesheetGen, calendar2csv, csv2timesheet, timesheetBatch, timesheetClient - run
+	  with --help
+	* repFormFiller - run with --help
+	* gui - importing the modules the GUI needs before its window is drawn
+	* exe - a frozen executable (e.g. built with PyInstaller), if given with --exe;
+	  only its wall time is measured, since it doesn't run with -X importtime
+
+command line usage:
+	python3 startupBenchmark.py -r [repeat] -o [outFile] -b [baseline] --budget [ms] --exe [exe]
+	- [repeat] is the number of times each entry point is started, keeping the fastest
+	- [outFile] is the (.json) file the timings are saved to, startupResults.json by default
+	- [baseline] is an optional (.json) file from an earlier run to compare with
+	- [ms] is the budget of each entry point's fastest start, 300 by default
+	- [exe] is an optional frozen executable to time, run with its --help (or --exeArgs)
+
+The script exits with an error if any entry point is over budget, or slower than the
+baseline by more than --tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from runBenchmarks import ROOT, RESULTS_VERSION, compareResults, _meta
+
+TIMESHEET_DIR = os.path.join(ROOT, 'timesheetGen', 'source')
+FORMFILLER_DIR = os.path.join(ROOT, 'repFormFiller', 'source')
+# the modules timesheetGenGUI.py imports before drawing its window
+GUI_IMPORTS = 'import tkinter, tkinter.ttk, tkinter.filedialog, calendar2csv, csv2timesheet, roster, stageTimer, sessionIndex'
+# (name, directory, arguments to python)
+ENTRY_POINTS = [
+	('timesheetGen', TIMESHEET_DIR, ['timesheetGen.py', '--help']),
+	('calendar2csv', TIMESHEET_DIR, ['calendar2csv.py', '--help']),
+	('csv2timesheet', TIMESHEET_DIR, ['csv2timesheet.py', '--help']),
+	('timesheetBatch', TIMESHEET_DIR, ['timesheetBatch.py', '--help']),
+	('timesheetClient', TIMESHEET_DIR, ['timesheetClient.py', '--help']),
+	('repFormFiller', FORMFILLER_DIR, ['repFormFiller.py', '--help']),
+	('gui', TIMESHEET_DIR, ['-c', GUI_IMPORTS]),
+]
+SLOWEST = 8 # slowest imports listed for each entry point
+
+def startupBenchmark(repeat=5, budgetMs=300.0, exe=None, exeArgs=('--help',)):
+	"""Given the number of runs and budget, times the start of each entry point and returns the results
+
+	Parameters
+	~~~~~~~~~~
+	repeat : int, optional
+		The number of times each entry point is started, the fastest being kept
+	budgetMs : float, optional
+		The most milliseconds the fastest start of each entry point may take
+	exe : str, optional
+		A frozen executable to time as well
+	exeArgs : tuple, optional
+		The arguments the frozen executable is run with
+
+	Returns
+	~~~~~~~
+	dict
+		The results, as saved to the (.json) file; entry points over budget are listed
+		under 'overBudget'
+	"""
+	results = {'version': RESULTS_VERSION, 'meta': _meta(None, repeat, None), 'results': {'startup': {}}, 'overBudget': []}
+	results['meta']['budgetMs'] = budgetMs
+	entries = [(name, cwd, [sys.executable]+args) for name, cwd, args in ENTRY_POINTS]
+	if exe is not None:
+		entries.append(('exe', os.path.dirname(os.path.abspath(exe)) or '.', [os.path.abspath(exe)]+list(exeArgs)))
+
+	print("%-15s %10s %10s %12s" % ('entry', 'wall (ms)', 'median', 'imports (ms)'))
+	for name, cwd, command in entries:
+		timing = _timeStart(command, cwd, repeat)
+		if not name == 'exe':
+			timing.update(_importTimes(command, cwd))
+		results['results']['startup'][name] = timing
+		if 'failed' in timing:
+			print("%-15s failed: %s" % (name, timing['failed']))
+			continue
+		over = timing['wall']*1000 > budgetMs
+		if over:
+			results['overBudget'].append(name)
+		print("%-15s %10.1f %10.1f %12s%s" % (name, timing['wall']*1000, timing['wallMedian']*1000,
+			'%.1f' % timing['importMs'] if 'importMs' in timing else '-', '  OVER BUDGET' if over else ''))
+		for module, ms in timing.get('slowest', []):
+			print("    %-40s %8.1f ms" % (module, ms))
+	return results
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _timeStart(command, cwd, repeat):
+	"""runs command repeat times, returning its fastest and median wall times"""
+	walls = []
+	for run in range(repeat):
+		wall0 = time.perf_counter()
+		proc = subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+		walls.append(time.perf_counter()-wall0)
+		if not proc.returncode == 0:
+			return {'failed': proc.stderr.decode('utf-8', 'replace').strip().split('\n')[-1]}
+	walls.sort()
+	return {'wall': walls[0], 'wallMedian': walls[len(walls)//2]}
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _importTimes(command, cwd):
+	"""runs a python command with -X importtime, returning the total import time and slowest imports
+
+	Each line of -X importtime output is formatted as:
+		import time: [self us] | [cumulative us] | [indentation][module]
+	where top level imports have no indentation, so the total is the sum of their
+	cumulative times. The slowest imports are ranked by their own (self) time.
+	"""
+	proc = subprocess.run([command[0], '-X', 'importtime']+command[1:], cwd=cwd,
+		stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+	total, modules = 0, []
+	for line in proc.stderr.decode('utf-8', 'replace').split('\n'):
+		if not line.startswith('import time:') or 'self [us]' in line:
+			continue
+		fields = line[len('import time:'):].split('|')
+		if not len(fields) == 3:
+			continue
+		selfUs, cumulativeUs, module = int(fields[0]), int(fields[1]), fields[2].rstrip()
+		if not module.startswith('  '): # top level import
+			total += cumulativeUs
+		modules.append((module.strip(), selfUs/1000))
+	modules.sort(key=lambda mod: -mod[1])
+	return {'importMs': total/1000, 'slowest': modules[:SLOWEST]}
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument("-r", "--repeat", type=int, default=5, help="The number of starts of each entry point")
+	argParser.add_argument("-o", "--outFile", type=str, default='startupResults.json',
+		help="The (.json) file to save the timings to")
+	argParser.add_argument("-b", "--baseline", type=str, default=None,
+		help="A (.json) file of earlier timings to compare with")
+	argParser.add_argument("--tolerance", type=float, default=0.2,
+		help="The fraction an entry point may be slower than the baseline before it is reported")
+	argParser.add_argument("--budget", type=float, default=300.0,
+		help="The most milliseconds the fastest start of each entry point may take")
+	argParser.add_argument("--exe", type=str, default=None, help="A frozen executable to time as well")
+	argParser.add_argument("--exeArgs", type=str, nargs='*', default=['--help'],
+		help="The arguments the frozen executable is run with")
+	args = argParser.parse_args()
+
+	results = startupBenchmark(args.repeat, args.budget, args.exe, args.exeArgs)
+	with open(args.outFile, 'w') as out:
+		json.dump(results, out, indent=1, sort_keys=True)
+	print("Output file created: ", os.path.abspath(args.outFile))
+
+	failed = False
+	if results['overBudget']:
+		print("Entry points over the budget of", args.budget, "ms: ", ', '.join(results['overBudget']))
+		failed = True
+	if args.baseline is not None:
+		with open(args.baseline, 'r') as base:
+			baseline = json.load(base)
+		regressions = compareResults(results, baseline, args.tolerance)
+		if regressions:
+			print("Entry points slower than the baseline: ", len(regressions))
+			failed = True
+	if failed:
+		sys.exit(1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
@@ -7,7 +7,7 @@ the summary (meeting name) formatted as:
 	tutorLastName-studentLastName-Course-Sport
 
 command line usage:
-	python3 calendar2csv.py inputICS -s [startDate] -e [endDate]
+	python3 calendar2csv.py inputICS -s [startDate] -e [endDate] -t [tutor] --mmap --profile [profFile]
 	- where inputICS is the user provided (.ics) file
 	- [startDate] and [endDate] are optional arguments to provide the starting
 	  and ending dates of the window to be parsed
@@ -15,6 +15,13 @@ command line usage:
 	- If no dates are provided, the full calendar will be parsed
 	- If only start date provided, then 2 weeks from date will be parsed
 	- If only end date provided, then full calendar up to date will be parsed
+	- [tutor] is an optional tutor's last name; if given, only meetings with summaries
+	  beginning with it are included
+	- The optional flag --mmap memory-maps the calendar and only decodes the events
+	  that could fall within the window, for very large calendars (see icsIndex.py)
+	- The optional flag --profile prints the time taken by each stage of the run and
+	  the numbers of events and sessions; if [profFile] is given, cProfile statistics
+	  are also saved to it (see stageTimer.py)
 
 This file can be used as a standalone script or imported as a module. If used as
 a script, an output file (.csv) will be created containing the found CATS tutor
@@ -28,20 +35,48 @@ For example, running:
 produces the output file "meetings_1_28_to_6_10.csv".
 
 If imported as a module, the following functions are also available:
+	* calendar2sessions - given a calendar file and dates, returns a list of Session records
+	  without writing a (.csv) file
+	* parseCalendar - given a calendar file, returns its list of meeting dictionaries
+	* scanCalendar - given a calendar file and dates, returns the meeting dictionaries that
+	  could fall within the window
+	* sessions2csv - given a list of sessions, writes them to a (.csv) file
+	* windowName - given starting and ending dates, returns the output file name suffix
+	* compileRule - given the DTSTART, RRULE and EXDATEs of a meeting, returns its (cached) rule
+	* expandWindow - given a recurrence rule and window, returns the occurrences within it
+	* meetingStart - given the DTSTART line of a meeting, returns its datetime
 	* date2dayNtime - given a datetime object, returns a list of the date and time
-	* dateStr2Obj - given a date string, returns a datetime object
+	* dateStr2Obj - given a date string, returns a datetime object (see dateWindow.py)
+	* icsDate2Obj - given an (.ics) date-time value, returns a datetime object
+
+requires:
+	* icsTokenizer.py, icsIndex.py, icsCache.py, simpleRule.py, session.py, stageTimer.py and
+	  dateWindow.py to be in the runpath of calendar2csv.py
 """
 
 import sys
 import argparse
 import csv
-import pytz
-from dateutil import rrule
-from dateutil.parser import parse
+import threading
 from datetime import *
-
-def calendar2csv(inputICS, startDate='01/01/1970', endDate='12/31/9999'):
-	"""Given a Google calendar (.ics) file, returns a list or (.csv) file of meetings
+from icsTokenizer import iterEventLines, parseEventLines, eventStamp, firstValue, unescapeText
+from session import Session
+from icsCache import loadMeetings, loadExpansions, saveExpansions
+from icsIndex import scanEvents
+from simpleRule import parseSimpleRule
+from stageTimer import currentTimer, profiled
+from dateWindow import dateStr2Obj, resolveWindow
+
+# maximum number of occurrences generated for a single recurring meeting in one window
+MAX_OCCURRENCES = 5000
+MAX_RULES = 4096 # compiled rules kept in memory
+
+# compiled rules by (DTSTART, RRULE, EXDATEs): (rule, excluded datetimes), oldest first
+_rules = {}
+_rulesLock = threading.Lock()
+
+def calendar2csv(inputICS, startDate='01/01/1970', endDate='12/31/9999', useCache=True, scan=False, tutor=None):
+	"""Given a Google calendar (.ics) file, returns a (.csv) file of meetings
 	
 	Parameters
 	~~~~~~~~~~
@@ -51,6 +86,12 @@ def calendar2csv(inputICS, startDate='01/01/1970', endDate='12/31/9999'):
 		The starting date of window to extract meetings from, formatted as: MM/DD/YYYY
 	endDate : str, optional
 		The ending date of window to extract meetings from, formatted as: MM/DD/YYYY
+	useCache : bool, optional
+		When True, the parsed calendar is read from and saved to the cache (see icsCache.py)
+	scan : bool, optional
+		When True, only the events that could fall within the window are decoded (see icsIndex.py)
+	tutor : str, optional
+		The tutor's last name; when given, only that tutor's meetings are included
 
 	Returns
 	~~~~~~~
@@ -59,149 +100,358 @@ def calendar2csv(inputICS, startDate='01/01/1970', endDate='12/31/9999'):
 	"""
 
 	# name output file with given dates
-	sDateSplit = [s.lstrip('0') for s in startDate.split('/')] # remove any leading 0's
-	eDateSplit = [e.lstrip('0') for e in endDate.split('/')]
-	outFname = "meetings_"+'_'.join(sDateSplit[:2])+'_to_'+'_'.join(eDateSplit[:2])+'.csv'
+	outFname = "meetings"+windowName(startDate, endDate)+'.csv'
 
-	# list of meetings where
-	# 	meeting = [date, student, sport, course, sTime, eTime]
-	calndrList = []
+	mtgList = calendar2sessions(inputICS, startDate, endDate, useCache, scan, tutor)
+	sessions2csv(mtgList, outFname, verbose=True)
+
+	if __name__ == '__main__':
+		print("Output file created: ", outFname)
+	else:
+		return outFname
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def calendar2sessions(inputICS, startDate='01/01/1970', endDate='12/31/9999', useCache=True, scan=False, tutor=None, keepExpansions=True):
+	"""Given a Google calendar (.ics) file, returns a list of sessions sorted by date and time
+	
+	Parameters
+	~~~~~~~~~~
+	inputICS : str
+		The input Google calendar (.ics) file
+	startDate : str, optional
+		The starting date of window to extract meetings from, formatted as: MM/DD/YYYY
+	endDate : str, optional
+		The ending date of window to extract meetings from, formatted as: MM/DD/YYYY
+	useCache : bool, optional
+		When True, the parsed calendar is read from and saved to the cache (see icsCache.py)
+	scan : bool, optional
+		When True, only the events that could fall within the window are decoded, instead
+		of parsing (or loading from the cache) the whole calendar (see icsIndex.py)
+	tutor : str, optional
+		The tutor's last name; when given, meetings whose summary names another tutor
+		are left out before they are expanded
+	keepExpansions : bool, optional
+		When True (and useCache), the recurrence expansions of the calendar's last window
+		are reused and replaced by this window's; False for windows that shouldn't
+		replace them, such as the GUI's preview
+
+	Returns
+	~~~~~~~
+	list
+		Session records (see session.py)
+	"""
+
+	timer = currentTimer() # records nothing unless the run is profiled
 
 	# convert input dates to datetime.date objects
 	startDate = dateStr2Obj(startDate)
 	endDate = dateStr2Obj(endDate)
 
-	with open(inputICS, 'r') as calndr:
-		for line in calndr:
-			# every meeting begins with "BEGIN:VEVENT"
-			if "BEGIN:VEVENT" in line:
-				meeting = {'dtStart': '', 'eTime': '', 'rrule': '', 'exDate': [], 'summ': '', 'recID': ''}
-				dtstart = calndr.readline().strip()
-				meeting['dtStart'] = 'DTSTART:' + dtstart.split(':')[1].rstrip('Z') # making sure to remove timezone info
-				line = calndr.readline() # advance to next line
-
-				# find meeting end date/time
-				if 'T' in line.split(':')[1]: # check that times are included
-					dtEndSplit = line.split(':')[1].split('T')
-					etUnfmtd = dtEndSplit[1].strip().rstrip('Z')
-					meeting['eTime'] = etUnfmtd[0:2]+':'+etUnfmtd[2:4]
-				else:
-					# print('WARNING: Times not found for meeting:\n',)
-					meeting['eTime'] = 'NaN'
-				
-				line = calndr.readline()
-
-				# check if meeting is recurring
-				if "RRULE" in line:
-					meeting['rrule'] = line.split(':')[1].replace('Z','').strip()
-					line = calndr.readline()
-
-				# check if any days are excluded
-				while "EXDATE" in line:
-					exdate = line.strip()
-					exdate = 'EXDATE:' + exdate.split(':')[1].rstrip('Z') # making sure to remove timezone info
-					meeting['exDate'].append(exdate)
-					line = calndr.readline()
-
-				# skip to meeting summary, or "RECURRENCE-ID" if present
-				while not (line.startswith("SUMMARY") or line.startswith("RECURRENCE-ID")):
-					line = calndr.readline()
-				if line.startswith("RECURRENCE-ID"):
-					meeting['recID'] = line.split(':')[1].strip()
-					while not (line.startswith("SUMMARY")):
-						line = calndr.readline()
-				if line.startswith("SUMMARY"):
-					meeting['summ'] = line.split(':')[1].strip()
+	# list of meeting dictionaries read from the calendar, skipping the parse if it is cached
+	with timer.stage('tokenize'):
+		if scan:
+			calndrList = scanCalendar(inputICS, startDate, endDate)
+		elif useCache:
+			calndrList = loadMeetings(inputICS, parseCalendar)
+		else:
+			calndrList = parseCalendar(inputICS)
+	timer.count('events', len(calndrList))
 
-				calndrList.append(meeting)
+	# window bounds as datetimes for clipping recurrence expansion
+	windowStart = datetime.combine(startDate, time.min)
+	windowEnd = datetime.combine(endDate, time.max)
 
 	# sort calendar list by summary
 	sortedCalndrList = sorted(calndrList, key = lambda i: i['summ'])
 
+	# index occurrences that were moved by a RECURRENCE-ID override as (UID, original start);
+	# the override is its own event, so the original occurrence is dropped during expansion
+	overridden = set()
+	with timer.stage('reconcile'):
+		for mtgSet in calndrList:
+			if mtgSet['recID']:
+				overridden.add((mtgSet['uid'], icsDate2Obj(mtgSet['recID'])))
+	timer.count('overrides', len(overridden))
+
+	# occurrences expanded in a previous run for this window, by (UID, RECURRENCE-ID, stamp, DTSTART, window)
+	keepExpansions = useCache and keepExpansions
+	expansions = loadExpansions(inputICS) if keepExpansions else {}
+	newExpansions = {}
+
 	# generate list of sessions to output
 	mtgList = []
 
-	for mtgSet in sortedCalndrList:
-		smrySplit = mtgSet['summ'].strip().split('-')
-		# check if it's a recurring meeting
-		if mtgSet['rrule'].strip(): # if rrule isn't empty string
-			mtgDays = rrule.rruleset()
-			ruleString = mtgSet['dtStart']+'\n'+mtgSet['rrule']+'\n'
-			for xdt in mtgSet['exDate']:
-				ruleString += xdt + '\n'				
-			if mtgSet['exDate']:
-				ruleString.rstrip('\n')
-			ruleString.rstrip('\n')
-			mtgDays.rrule(rrule.rrulestr(ruleString))
-
-			for mtgday in mtgDays:
-				# check if meeting date is within given starting and ending dates
-				if (startDate <= mtgday.date() <= endDate):
-					dateTimeStr = date2dayNtime(mtgday)
-					sDate = dateTimeStr[0]
-					sTime = dateTimeStr[1] 
-					if len(smrySplit) > 3:
-						mtgList.append([sDate, smrySplit[1].strip(), smrySplit[2].strip(), smrySplit[3].strip(), sTime, mtgSet['eTime'], mtgSet['recID']])
-					else:
-						# handle cases of incorrectly formatted summary
-						print("WARNING: Meeting summary incorrectly formatted and was not included in output file: ",smrySplit)
-						print(" Correct format: tutorLastName-studentLastName-Course-Sport")
-		# if no rrules, then just a single meeting
-		else:
-			ruleString = mtgSet['dtStart']+'\n'+'RRULE:FREQ=DAILY;COUNT=1' # freq still required for single session using rrule
-			mtgday = rrule.rruleset()
-			mtgday.rrule(rrule.rrulestr(ruleString)) # mtgday should be list with single datetime object
-			# check if meeting date is within given starting and ending dates
-			if (startDate <= mtgday[0].date() <= endDate):
-				dateTimeStr = date2dayNtime(mtgday[0])
-				sDate = dateTimeStr[0]
-				sTime = dateTimeStr[1] 
-				if len(smrySplit) > 3:
-					mtgList.append([sDate, smrySplit[1].strip(), smrySplit[2].strip(), smrySplit[3].strip(), sTime, mtgSet['eTime'], mtgSet['recID']])
-				else:
+	# malformed summaries are warned about once per event, and only if it may fall in the window
+	windowDates = (startDate.strftime('%Y%m%d'), endDate.strftime('%Y%m%d'))
+	if tutor is not None:
+		tutor = tutor.strip().lower()
+
+	with timer.stage('expand'):
+		for mtgSet in sortedCalndrList:
+			smrySplit = mtgSet['summ'].strip().split('-')
+			# summaries are checked once per event, before any recurrence is expanded
+			if not len(smrySplit) > 3:
+				if _mayOverlap(mtgSet, *windowDates):
 					# handle cases of incorrectly formatted summary
 					print("WARNING: Meeting summary incorrectly formatted and was not included in output file: ",smrySplit)
 					print(" Correct format: tutorLastName-studentLastName-Course-Sport")
+				continue
+			if tutor is not None and not smrySplit[0].strip().lower() == tutor:
+				continue # another tutor's meeting
+			# events left after the summary and tutor checks, counted one at a time so a cancel stops here
+			timer.count('expanded')
+			# check if it's a recurring meeting
+			if mtgSet['rrule'].strip(): # if rrule isn't empty string
+				expansionKey = (mtgSet['uid'], mtgSet['recID'], mtgSet['stamp'], mtgSet['dtStart'], windowStart, windowEnd)
+				mtgDays = expansions.get(expansionKey) if mtgSet['stamp'] is not None else None
+				if mtgDays is None:
+					# rules shared by several events or windows are only parsed once
+					ruleSet, exDates = compileRule(mtgSet['dtStart'], mtgSet['rrule'], mtgSet['exDate'])
+
+					# only occurrences within the given starting and ending dates are generated
+					mtgDays = expandWindow(ruleSet, windowStart, windowEnd, summ=mtgSet['summ'], exDates=exDates)
+				if mtgSet['stamp'] is not None:
+					newExpansions[expansionKey] = mtgDays
+
+				for mtgday in mtgDays:
+					if not mtgSet['recID'] and (mtgSet['uid'], mtgday) in overridden:
+						continue
+					mtgList.append(_makeSession(mtgday, mtgSet, smrySplit))
+			# if no rrules, then just a single meeting
+			else:
+				mtgday = meetingStart(mtgSet['dtStart'])
+				# check if meeting date is within given starting and ending dates
+				isMoved = not mtgSet['recID'] and (mtgSet['uid'], mtgday) in overridden
+				if (startDate <= mtgday.date() <= endDate) and not isMoved:
+					mtgList.append(_makeSession(mtgday, mtgSet, smrySplit))
 
-	# replace meetings referenced by recID's; these are meetings that had their times moved
-	mtg2replace = []
-	newMtgs = []
-	for mtg in mtgList:
-		if mtg[6]:
-			mtgDayNTime = date2dayNtime(parse(mtg[6]))
-			newMtgs.append([mtgDayNTime[0],mtg[1],mtg[2],mtg[3],mtg[4],mtg[5]])
-			mtg2replace.append([mtgDayNTime[0],mtg[1],mtg[2],mtg[3],mtgDayNTime[1]])
-
-	outList = []
-	for mtg in mtgList:
-		if mtg[:5] not in mtg2replace:
-			outList.append(mtg[:6])
-	
-	for mtg in newMtgs:
-		if mtg not in outList:
-			outList.append(mtg)
+	# keep this window's expansions for the next run, only rewriting them if events changed
+	if keepExpansions and not newExpansions.keys() == expansions.keys():
+		saveExpansions(inputICS, newExpansions)
+
+	# sort output sessions by date and time
+	with timer.stage('sort'):
+		mtgList.sort(key=lambda i: i.start)
+	timer.count('sessions', len(mtgList))
+
+	return mtgList
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def parseCalendar(inputICS, previous=None):
+	"""Given a Google calendar (.ics) file, returns a list of meeting dictionaries
+
+	If previous is given as the meetings parsed from an earlier version of the same
+	calendar, events whose UID, SEQUENCE and LAST-MODIFIED are unchanged are carried
+	over from it rather than parsed again.
+	"""
+	# meetings from the previous parse by (UID, RECURRENCE-ID)
+	unchanged = {}
+	if previous:
+		for meeting in previous:
+			if meeting['stamp'] is not None and meeting['uid']:
+				unchanged[(meeting['uid'], meeting['recID'])] = meeting
+
+	calndrList = []
+	with open(inputICS, 'r', encoding='utf-8') as calndr:
+		# every meeting is a VEVENT; the tokenizer yields them one at a time
+		for lines in iterEventLines(calndr):
+			if unchanged:
+				key, stamp = eventStamp(lines)
+				meeting = unchanged.get(key)
+				if stamp is not None and meeting is not None and meeting['stamp'] == stamp:
+					calndrList.append(meeting)
+					continue
+			meeting = _event2meeting(parseEventLines(lines))
+			if meeting is not None:
+				calndrList.append(meeting)
+	return calndrList
 
-	# sort output rows by date and time
-	outList.sort(key=lambda i: (dateStr2Obj(i[0]),i[4]))
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def scanCalendar(inputICS, startDate, endDate):
+	"""Given a Google calendar (.ics) file and window date objects, returns the meeting dictionaries that could fall within it
 
-	# generate output csv
-	with open(outFname, 'w') as outputCSV:
+	The calendar is memory-mapped and events are ruled out at the byte level, so only
+	the candidate events are decoded (see icsIndex.py). Events whose summary can't be a
+	CATS tutor meeting are left out, so they aren't warned about as they are by
+	parseCalendar.
+	"""
+	calndrList = []
+	for lines in scanEvents(inputICS, startDate, endDate):
+		meeting = _event2meeting(parseEventLines(lines))
+		if meeting is not None:
+			calndrList.append(meeting)
+	return calndrList
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def sessions2csv(sessions, outFname, verbose=False):
+	"""Given a list of sessions, writes them to a (.csv) file with headers and returns its name"""
+	with currentTimer().stage('csv'), open(outFname, 'w') as outputCSV:
 		# create header fields for csv
 		fieldnames = ['Date', 'Student', 'Sport', 'Course', 'StartTime', 'EndTime']
 		csvwriter = csv.DictWriter(outputCSV, fieldnames=fieldnames)
 		csvwriter.writeheader()
 		count = 0
-		print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
-		for mtg in outList:
+		if verbose:
+			print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+		for mtg in sessions:
 			count += 1
-			print(mtg)
-			csvwriter.writerow({'Date': mtg[0], 'Student': mtg[1], 'Sport': mtg[2], 'Course': mtg[3], 'StartTime': mtg[4], 'EndTime': mtg[5]})
-		print("Total sessions: ",count)
+			row = mtg.toRow()
+			if verbose:
+				print(row)
+			csvwriter.writerow({'Date': row[0], 'Student': row[1], 'Sport': row[2], 'Course': row[3], 'StartTime': row[4], 'EndTime': row[5]})
+		if verbose:
+			print("Total sessions: ",count)
+	return outFname
 
-		if __name__ == '__main__':
-			print("Output file created: ", outFname)
-		else:
-			return outFname
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def windowName(startDate, endDate):
+	"""Given starting and ending date strings, returns the suffix used in output file names
+
+	For example, "01/28/1989" and "06/10/2012" give "_1_28_to_6_10".
+	"""
+	sDateSplit = [s.lstrip('0') for s in startDate.split('/')] # remove any leading 0's
+	eDateSplit = [e.lstrip('0') for e in endDate.split('/')]
+	return '_'+'_'.join(sDateSplit[:2])+'_to_'+'_'.join(eDateSplit[:2])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def compileRule(dtStart, ruleText, exDates=()):
+	"""Given the DTSTART line, RRULE value and EXDATE lines of a meeting, returns (rule, excluded datetimes)
+
+	The rule is a SimpleRule (see simpleRule.py) for the plain DAILY and WEEKLY rules of
+	most meetings, otherwise a dateutil rrule, starting at DTSTART. The excluded
+	datetimes are a frozenset to be skipped by expandWindow. Compiled rules are kept in memory by
+	(DTSTART, RRULE, set of EXDATEs), so the same rule isn't parsed again for another
+	window or another event repeating it.
+	"""
+	key = (dtStart, ruleText, frozenset(exDates))
+	with _rulesLock:
+		compiled = _rules.get(key)
+	if compiled is not None:
+		return compiled
+
+	start = meetingStart(dtStart)
+	excluded = frozenset(icsDate2Obj(xdt[len('EXDATE:'):]) for xdt in key[2])
+	rule = parseSimpleRule(start, ruleText)
+	if rule is None:
+		from dateutil import rrule # imported on first use, so the tools start without it
+		rule = rrule.rrulestr(ruleText, dtstart=start)
+	compiled = (rule, excluded)
+	with _rulesLock:
+		_rules[key] = compiled
+		while len(_rules) > MAX_RULES:
+			del _rules[next(iter(_rules))]
+	return compiled
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def meetingStart(dtStart):
+	"""Given the DTSTART line of a meeting, such as "DTSTART:20210830T140000", returns its datetime"""
+	try:
+		return icsDate2Obj(dtStart[len('DTSTART:'):])
+	except ValueError:
+		# an unusual date-time format, left to dateutil's parser
+		from dateutil import rrule
+		return rrule.rrulestr(dtStart+'\nRRULE:FREQ=DAILY;COUNT=1')[0]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def expandWindow(ruleSet, windowStart, windowEnd, budget=MAX_OCCURRENCES, summ='', exDates=frozenset()):
+	"""Given a dateutil rule (set) and window datetimes, returns the occurrences within the window
+
+	Expansion stops at the first occurrence past windowEnd, so rules without an UNTIL
+	or COUNT are never walked past the window. Occurrences in exDates are skipped, and
+	at most budget occurrences are returned.
+	"""
+	occurrences = []
+	for occurrence in ruleSet.xafter(windowStart, inc=True):
+		if occurrence > windowEnd:
+			break
+		if occurrence in exDates:
+			continue
+		if len(occurrences) >= budget:
+			print("WARNING: Meeting has more than", budget, "occurrences in the given window and was truncated: ", summ)
+			break
+		occurrences.append(occurrence)
+	return occurrences
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _mayOverlap(mtgSet, windowStart, windowEnd):
+	"""Given a meeting dictionary and window dates as 'YYYYMMDD', returns False if it can't occur in the window
+
+	Only DTSTART and the UNTIL or COUNT of the rule are compared, so no recurrence is
+	expanded. The last occurrence of a DAILY or WEEKLY rule ending by COUNT is at most
+	COUNT-1 intervals after DTSTART; other rules ending by COUNT may reach the window.
+	"""
+	dtStart = mtgSet['dtStart'][len('DTSTART:'):len('DTSTART:')+8]
+	if not dtStart.isdigit():
+		return True
+	if dtStart > windowEnd:
+		return False
+	if not mtgSet['rrule'].strip():
+		return dtStart >= windowStart
+	rule = dict(part.split('=', 1) for part in mtgSet['rrule'].upper().split(';') if '=' in part)
+	if rule.get('UNTIL', '')[:8].isdigit():
+		return rule['UNTIL'][:8] >= windowStart
+	if rule.get('FREQ') in ('DAILY', 'WEEKLY') and rule.get('COUNT', '').isdigit():
+		step = int(rule['INTERVAL']) if rule.get('INTERVAL', '').isdigit() else 1
+		if rule['FREQ'] == 'WEEKLY':
+			step *= 7
+		lastDate = datetime.strptime(dtStart, '%Y%m%d') + timedelta(days=step*max(int(rule['COUNT'])-1, 0))
+		return lastDate.strftime('%Y%m%d') >= windowStart
+	return True
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _makeSession(mtgday, mtgSet, smrySplit):
+	"""Given an occurrence datetime, its meeting dictionary and split summary, returns a Session"""
+	end = None
+	if mtgSet['eTime'] is not None:
+		end = datetime.combine(mtgday.date(), mtgSet['eTime']) # assuming session times on same date
+	return Session(mtgday, end, smrySplit[1].strip(), smrySplit[2].strip(), smrySplit[3].strip())
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _event2meeting(event):
+	"""Given a VEVENT dictionary from the tokenizer, returns a meeting dictionary or None"""
+	dtstart = firstValue(event, 'DTSTART')
+	if dtstart is None:
+		return None
+	meeting = {'dtStart': '', 'eTime': None, 'rrule': '', 'exDate': [], 'summ': '', 'recID': '', 'uid': '', 'stamp': None}
+	# TZID parameters are ignored, times are kept as local to the calendar
+	meeting['dtStart'] = 'DTSTART:' + dtstart[1].strip().rstrip('Z') # making sure to remove timezone info
+
+	# find meeting end date/time
+	dtend = firstValue(event, 'DTEND')
+	if dtend is not None and 'T' in dtend[1]: # check that times are included
+		etUnfmtd = dtend[1].split('T')[1].strip().rstrip('Z')
+		meeting['eTime'] = time(int(etUnfmtd[0:2]), int(etUnfmtd[2:4]))
+
+	# check if meeting is recurring
+	rule = firstValue(event, 'RRULE')
+	if rule is not None:
+		meeting['rrule'] = rule[1].replace('Z','').strip()
+
+	# check if any days are excluded; an EXDATE may list several comma separated dates
+	for params, value in event.get('EXDATE', []):
+		for xdt in value.split(','):
+			if xdt.strip():
+				meeting['exDate'].append('EXDATE:' + xdt.strip().rstrip('Z'))
+
+	uid = firstValue(event, 'UID')
+	if uid is not None:
+		meeting['uid'] = uid[1].strip()
+
+	recID = firstValue(event, 'RECURRENCE-ID')
+	if recID is not None:
+		meeting['recID'] = recID[1].strip()
+
+	# stamp used to tell whether the event changed in a later export
+	lastMod = firstValue(event, 'LAST-MODIFIED')
+	if lastMod is not None:
+		sequence = firstValue(event, 'SEQUENCE')
+		meeting['stamp'] = (sequence[1].strip() if sequence is not None else '0', lastMod[1].strip())
+
+	summary = firstValue(event, 'SUMMARY')
+	if summary is not None:
+		meeting['summ'] = unescapeText(summary[1]).strip()
+
+	return meeting
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def date2dayNtime(datetimeObj):
@@ -220,20 +470,12 @@ def date2dayNtime(datetimeObj):
 	return [dateStr, timeStr]
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def dateStr2Obj(datestring):
-	"""Given a date string formatted as "MM/DD/YYYY", returns a date object"""
-	if not datestring.count('/') == 2:
-		print("Date must be formatted as MM/DD/YYYY\n")
-	else:
-		dateSplit = datestring.split('/')
-		month = int(dateSplit[0])
-		day = int(dateSplit[1])
-		year = int(dateSplit[2])
-		try:
-			dateObj = date(month=month, day=day, year=year)
-		except ValueError:
-			print("Undefined date given: ",datestring,"\n")
-		return dateObj
+def icsDate2Obj(icsDate):
+	"""Given an (.ics) date or date-time value such as "20210830T140000Z", returns a datetime object"""
+	icsDate = icsDate.strip().rstrip('Z') # remove timezone info as done for DTSTART
+	if 'T' in icsDate:
+		return datetime.strptime(icsDate[:15], '%Y%m%dT%H%M%S')
+	return datetime.strptime(icsDate[:8], '%Y%m%d')
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def main():
@@ -257,17 +499,37 @@ def main():
 		default="12/31/9999",
 		help="The ending date of window to extract meetings from, formatted as: MM/DD/YYYY"
 	)
+	argParser.add_argument(
+		"-t", "--tutor",
+		type=str,
+		default=None,
+		help="""The tutor's last name, to include only their meetings"""
+	)
+	argParser.add_argument(
+		"--no-cache",
+		dest='useCache',
+		action='store_false',
+		help="""Parse the calendar again instead of using the cached parse from a previous run"""
+	)
+	argParser.add_argument(
+		"--mmap",
+		dest='scan',
+		action='store_true',
+		help="""Memory-map the calendar and only decode the events that could fall within the window"""
+	)
+	argParser.add_argument(
+		"--profile",
+		nargs='?',
+		const='',
+		default=None,
+		metavar='PROFFILE',
+		help="""Print the time taken by each stage, and save cProfile statistics to PROFFILE if given"""
+	)
 	args = argParser.parse_args()
 
-	startDate = dateStr2Obj(args.startDate)
-	# if startDate is set and not endDate, set endDate to 2 weeks past the startDate
-	if (not args.startDate == '01/01/1970' and args.endDate == '12/31/9999'):
-		endDate = startDate + timedelta(days=13) # 13 to exclude 3rd instance of starting day
-	else:
-		endDate = dateStr2Obj(args.endDate)
-	endDate = str(endDate.month)+'/'+str(endDate.day)+'/'+str(endDate.year)
+	endDate = resolveWindow(args.startDate, args.endDate)
 
-	calendar2csv(args.inputICS, args.startDate, endDate)
+	profiled(args.profile, calendar2csv, args.inputICS, args.startDate, endDate, args.useCache, args.scan, args.tutor)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 if __name__ == "__main__":
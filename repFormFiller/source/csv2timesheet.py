@@ -14,19 +14,27 @@ This file can also be imported as a module. It is intended to be used in
 conjunction with the calendar2csv.py module. 
 
 command line usage:
-	python3 csv2timesheet.py inputCSV -n [namesFile]
+	python3 csv2timesheet.py inputCSV -n [namesFile] --stream --profile [profFile]
 	- where inputCSV is the user provided (.csv) file
 	- [namesFile] is an optional argument to provide a file (.txt) of names with
 	  the format:
 	  	tutor:
 		tutor's last name, tutor's first name
 		students:
-		student's last name, student's first name
+		student's last name, student's first name, [sport], [course]
 		...
+	  where the sport and course of each student are optional
+
+The optional flag --stream writes the document as the meetings are read rather than
+building it in memory first, which keeps memory use bounded for very large timesheets.
+The optional flag --profile prints the time taken by each stage of the run, and saves
+cProfile statistics to [profFile] if given (see stageTimer.py).
 
 The optional argument [namesFile] must be included for the first names of students
 and the tutor's name to be included in the output document.
-**Note: this option won't work properly if students share a last name
+**Note: students who share a last name are told apart by the sport and course given
+  for them in the namesFile; if a session still matches more than one, only the
+  last name is used and a warning is printed
 
 The output file will be named accordingly:
 	If the namesFile is provided:
@@ -40,22 +48,31 @@ The output file will be named accordingly:
 		Else:
 			output file = timesheet.docx
 
+If imported as a module, sessions2timesheet() accepts the sessions directly, for
+example as returned by calendar2csv.calendar2sessions(), without a (.csv) file.
+
 requires:
 	* the MSWord document "timesheetTemplate.docx" to be in runpath of csv2timesheet.py
+	* session.py, sessionTable.py, roster.py, templateCache.py, docxStream.py and stageTimer.py to be in
+	  runpath of csv2timesheet.py
+	* NumPy, used for the hours and totals of the sessions (see sessionTable.py)
 """
 
+import os
 import sys
 import argparse
 import csv
-from datetime import *
-from docx import Document
-from docx.enum.section import WD_ORIENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_ALIGN_VERTICAL
-from docx.shared import Inches
 from copy import deepcopy
+from session import Session
+from roster import Roster, loadRoster
+from templateCache import loadTemplate, TEMPLATE_FILE
+from docxStream import writeDocx, splitTemplate, fillTemplate
+from stageTimer import currentTimer, profiled, Cancelled
+# python-docx is imported by the functions using it, so --help and the GUI window don't wait on it
+
+ROWS_PER_PAGE = 10 # sessions in the table on each page of the timesheet
 
-def csv2timesheet(inputCSV, namesFile='none'):
+def csv2timesheet(inputCSV, namesFile='none', stream=False):
 	"""Given a (.csv) file of meetings, returns a (.docx) file in CATS timesheet format
 	
 	Parameters
@@ -68,122 +85,285 @@ def csv2timesheet(inputCSV, namesFile='none'):
 			tutor:
 			[tutor's last name], [tutor's first name]
 			students:
-			[student's last name], [student's first name]
+			[student's last name], [student's first name], [sport], [course]
 			...
+		where sport and course are optional and tell apart students sharing a last name
+
+	stream : bool, optional
+		When True, the document is written as the (.csv) is read, see sessions2timesheet()
+
 	Returns
 	~~~~~~~
 	file(.docx)
 		A MSWord document of the meetings in CATS timesheet format
 	"""
 
-	# open template document
-	doc = Document('timesheetTemplate.docx')
-	table = doc.tables[0]                        
-	tableIndex = 0
-
-	# if namesFile provided, assemble a list of names from it: [tutor, [student]]
-	if not namesFile == 'none':
-		if (checkFormat(namesFile)):
-			namesList = namesFile2list(namesFile)
-			tutor, students = namesList[0], namesList[1]
-		else:
-			print("The given namesFile doesn't have the correct format and won't be used.")
-			namesFile = 'none'
+	if 'meetings' in inputCSV:
+		outFile = 'timesheet'+inputCSV.lstrip('meetings').rstrip('.csv')+'.docx'
+	else:
+		outFile = 'timesheet.docx'
 
 	with open(inputCSV, 'r') as csvReader:
 		inCSV = csv.reader(csvReader)
-		tblRowCt = 0
-		totalHours = 0
-		totalSessions = 0
-		for lnum, line in enumerate(inCSV):
-			if not len(line) == 0 and not lnum == 0: # skip past header and blank rows
-				newRow = table.add_row()
-				tblRowCt += 1
-				totalSessions += 1
-				newRow.height = Inches(0.4)
-				rowCells = newRow.cells
-				for i in range(6):
-					rowCells[i].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-					if not i == 1:
-						rowCells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER # otherwise LEFT
-					if i == 0: 
-						# format date removing year
-						dateSplit = line[i].split('/')
-						date = dateSplit[0] + '/' + dateSplit[1]
-						txtrun = rowCells[i].paragraphs[0].add_run(date)
-						txtrun.bold = False # formatting is only applied to text when using runs
-					elif i == 1:
-						# find last name in namesFile if provided
-						if not namesFile == 'none':
-							fName = findFullName(line[i], students)
-						else:
-							fName = line[i]
-						txtrun = rowCells[i].paragraphs[0].add_run(fName)
-					else:
-						txtrun = rowCells[i].paragraphs[0].add_run(line[i])
-
-				# check for hours by difference between times
-				sTime, eTime = line[4], line[5]
-				sTimeSplit = sTime.split(':')
-				sHrs, sMin = sTimeSplit[0], sTimeSplit[1]
-				eTimeSplit = eTime.split(':')
-				eHrs, eMin = eTimeSplit[0], eTimeSplit[1]
-				sTime = datetime(2021, 1, 1, int(sHrs), int(sMin), 0) # assuming session times on same date
-				eTime = datetime(2021, 1, 1, int(eHrs), int(eMin), 0)
-
-				timeDiff = eTime - sTime # seconds stored in the timedelta object
-				timeHours = timeDiff.total_seconds() / 3600 # convert to hours
-				totalHours += timeHours
-				rowCells[7].text = str(timeHours)
-				rowCells[7].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-				rowCells[7].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-				# if 10 rows in table, create new table on new page
-				if tblRowCt == 10:
-					tblRowCt = 0
-					newSec = doc.add_section()
-					tabelCopy = deepcopy(table._tbl)
-					p = doc.add_paragraph()
-					p._p.addnext(tabelCopy)
-					tableIndex += 1
-					table = doc.tables[tableIndex]
-
-					# remove rows from copy leaving the header
-					for i in range(10):
-						tbl = table._tbl
-						row = table.rows[1]
-						tr = row._tr
-						tbl.remove(tr)
+		# skip past header and blank rows
+		sessions = (Session.fromRow(line) for lnum, line in enumerate(inCSV) if not len(line) == 0 and not lnum == 0)
+		return sessions2timesheet(sessions, namesFile, outFile, stream=stream)
 
-		p = doc.add_paragraph()
-		seshText = "\nTotal Sessions: \t" + str(totalSessions)
-		hrText = "\nTotal Hours:   \t" + str(totalHours)
-		seshRun = p.add_run(seshText)
-		seshRun.bold = True
-		hrRun = p.add_run(hrText)
-		hrRun.bold = True
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def sessions2timesheet(sessions, namesFile='none', outFile='timesheet.docx', outDir='.', stream=False):
+	"""Given an iterable of sessions, returns a (.docx) file in CATS timesheet format
+	
+	Parameters
+	~~~~~~~~~~
+	sessions : iterable
+		Session records (see session.py), such as returned by
+		calendar2csv.calendar2sessions()
+
+	namesFile : str, optional
+		The input (.txt) file of tutor's and students' names, as for csv2timesheet()
+
+	outFile : str, optional
+		The name of the output document; prefixed with the tutor's last name if the
+		namesFile is used
+
+	outDir : str, optional
+		The directory the output document is saved in
+
+	stream : bool, optional
+		When True, the document is written as the sessions are read instead of being
+		built in memory first, for timesheets with very many sessions
+
+	Returns
+	~~~~~~~
+	file(.docx)
+		A MSWord document of the meetings in CATS timesheet format
+	"""
+
+	timer = currentTimer() # records nothing unless the run is profiled
+
+	# copy of template document, parsed once per process
+	with timer.stage('template'):
+		doc = loadTemplate()
+
+	# if namesFile provided, assemble a roster of names from it, indexed by last name
+	if not namesFile == 'none':
+		roster = loadRoster(namesFile) # checked and parsed in one read, then kept
+		if roster is None:
+			print("The given namesFile doesn't have the correct format and won't be used.")
+			namesFile = 'none'
 
-	if 'meetings' in inputCSV:
-		outFile = 'timesheet'+inputCSV.lstrip('meetings').rstrip('.csv')+'.docx'
-	else:
-		outFile = 'timesheet.docx'
 	if not namesFile == 'none':
-		lastName = tutor.split(',')[0].lower()
+		lastName = roster.tutor.lastName.lower()
 		outFile = lastName+'_'+outFile
-	doc.save(outFile)
+	outFile = os.path.join(outDir, outFile)
+
+	warned = set() # shared last names warned about in this timesheet
+	def fullName(line):
+		# find last name in namesFile if provided, telling shared last names apart by sport and course
+		if not namesFile == 'none':
+			return roster.fullName(line.student, line.sport, line.course, warned)
+		return line.student
+
+	if stream:
+		with timer.stage('stream'):
+			_streamTimesheet(doc, sessions, fullName, outFile)
+		print("Output file created: ", outFile)
+		return outFile
+
+	# one table of ROWS_PER_PAGE sessions per page, all created before any are filled
+	with timer.stage('paginate'):
+		sessions = list(sessions)
+		tables = _paginate(doc, -(-len(sessions) // ROWS_PER_PAGE)) # ceiling division
+
+		# every row is a copy of one formatted row, with only its text filled in
+		rowPrototype, textIndices = _rowPrototype(tables[0])
+
+	from docx.oxml.ns import qn
+	from sessionTable import SessionTable
+	totalSessions = 0
+	with timer.stage('rows'):
+		# hours by difference between times, computed for every session at once
+		table = SessionTable.fromSessions(sessions)
+		hours = table.hours.tolist()
+		totalHours = table.totalHours() if len(table) else 0
+		for line in sessions:
+			timeHours = hours[totalSessions]
+			cellText = _cellText(line, fullName(line), timeHours)
+
+			newTr = deepcopy(rowPrototype)
+			textNodes = list(newTr.iter(qn('w:t')))
+			for i, text in enumerate(cellText):
+				textNodes[textIndices[i]].text = text
+			tables[totalSessions // ROWS_PER_PAGE]._tbl.append(newTr)
+			totalSessions += 1
+			timer.count('rows') # counted per row, so a cancel stops here
+
+		_addTotals(doc, str(totalSessions), str(totalHours))
+
+	with timer.stage('save'):
+		doc.save(outFile)
 	print("Output file created: ", outFile)
 	return outFile
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-# NOTICE: won't properly work for students that share a last name
-def findFullName(lastName,namesList):
-	"""Given a last name and a list of names, returns the full name"""
-	fullName = lastName # return given name if not found in file
-	for name in namesList:
-		nameSplit = name.split(',')
-		if nameSplit[0] == lastName:
-			fullName = nameSplit[1]+' '+nameSplit[0]
-	return fullName
+def _streamTimesheet(doc, sessions, fullName, outFile):
+	"""Given the template document, sessions, full name function and output file, writes the timesheet as a stream
+
+	The layout is built once with python-docx as a skeleton of three pages, one row and
+	the totals, then cut into (.xml) fragments (see _skeletonParts). The body is written
+	from the fragments as the sessions are read, so memory stays the same however many
+	sessions there are, and the document is laid out as the one built in memory.
+	"""
+	timer = currentTimer()
+	head, row, firstEnd, firstBreak, tableEnd, nextBreak, tail = _skeletonParts(doc, 3)
+	rowParts = splitTemplate(row)
+	# placeholders in the prototype row are numbered by cell: date..endTime are 0-5, hours is 7
+	cellNums = [0, 1, 2, 3, 4, 5, 7]
+
+	totals = {'sessions': 0, 'minutes': 0}
+	def bodyChunks():
+		yield head
+		chunk = []
+		for line in sessions:
+			if totals['sessions'] and totals['sessions'] % ROWS_PER_PAGE == 0:
+				if totals['sessions'] == ROWS_PER_PAGE:
+					chunk.append(firstEnd+firstBreak)
+				else:
+					chunk.append(tableEnd+nextBreak)
+			timeHours = line.hours
+			totals['minutes'] += line.minutes
+			totals['sessions'] += 1
+			cellText = _cellText(line, fullName(line), timeHours)
+			chunk.append(fillTemplate(rowParts, dict(zip(cellNums, cellText))))
+			timer.count('rows') # counted per row, so a cancel stops here
+			if len(chunk) >= 100:
+				yield b''.join(chunk)
+				chunk = []
+		yield b''.join(chunk)
+		# a single page ends as the template does, without a section break
+		end = _skeletonParts(loadTemplate(), 1)[2] if totals['sessions'] <= ROWS_PER_PAGE else tail
+		# total from whole minutes, as SessionTable.totalHours
+		totalHours = totals['minutes'] / 60 if totals['sessions'] else 0
+		yield end.replace(b'@SESSIONS', str(totals['sessions']).encode()).replace(b'@HOURS', str(totalHours).encode())
+
+	try:
+		writeDocx(TEMPLATE_FILE, outFile, bodyChunks())
+	except Cancelled:
+		os.remove(outFile) # left part written
+		raise
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _skeletonParts(doc, numPages):
+	"""Given the template document and number of pages, returns the (.xml) fragments of its timesheet body
+
+	The skeleton is paginated, given a row and the totals, and marked with comments:
+		first table's header <!--ROW--> row <!--ROWS--> end of the first table and the
+		template's paragraphs after it <!--PAGES--> section break and next table's header
+		<!--ROWS--> ... totals
+	then cut at the comments. The row is serialized within the document, so it uses the
+	namespaces declared at its root. The template's paragraphs after its table are only in
+	the fragment ending the first table, as they are in the built document. python-docx
+	keeps the headers and footers only in the first section break, so for three pages the
+	fragments are:
+		[head, row, end of first table, first section break, end of table, next section break, totals]
+	and for a single page:
+		[head, row, end of the table and totals]
+	"""
+	import re
+	from docx.opc.oxml import serialize_part_xml
+	from lxml import etree
+	tables = _paginate(doc, numPages)
+	rowPrototype = _rowPrototype(tables[0])[0]
+	tables[0]._tbl.append(etree.Comment('ROW'))
+	tables[0]._tbl.append(rowPrototype)
+	for table in tables:
+		table._tbl.append(etree.Comment('ROWS'))
+	for table in tables[1:]:
+		# each following page begins with a section break paragraph before its table's paragraph
+		table._tbl.getprevious().getprevious().addprevious(etree.Comment('PAGES'))
+	_addTotals(doc, '@SESSIONS', '@HOURS')
+	return re.split(rb'<!--(?:ROW|ROWS|PAGES)-->', serialize_part_xml(doc.element))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _cellText(line, fName, timeHours):
+	"""Given a session, the student's full name and hours, returns the text of each filled cell"""
+	# date is formatted removing year
+	return [str(line.start.month)+'/'+str(line.start.day), fName, line.sport, line.course, line.startStr, line.endStr, str(timeHours)]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _addTotals(doc, totalSessions, totalHours):
+	"""Given the document and totals as strings, adds the paragraph of totals at the end"""
+	p = doc.add_paragraph()
+	seshText = "\nTotal Sessions: \t" + totalSessions
+	hrText = "\nTotal Hours:   \t" + totalHours
+	seshRun = p.add_run(seshText)
+	seshRun.bold = True
+	hrRun = p.add_run(hrText)
+	hrRun.bold = True
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _paginate(doc, numPages):
+	"""Given the template document and number of pages, returns a list of one empty table per page
+
+	The first page uses the template's table. Each following page is started with a new
+	section, and its table is a copy of the template's table holding only the header row.
+	"""
+	from docx.table import Table
+	table = doc.tables[0]
+	tablePrototype = deepcopy(table._tbl) # copied before any rows are added
+	tables = [table]
+	for page in range(1, numPages):
+		doc.add_section()
+		p = doc.add_paragraph()
+		tableCopy = deepcopy(tablePrototype)
+		p._p.addnext(tableCopy)
+		tables.append(Table(tableCopy, table._parent))
+	return tables
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _rowPrototype(table):
+	"""Given a timesheet table, returns a formatted row element and the positions of its text nodes
+
+	The row is built once with the height, alignment and runs of a session row and then
+	removed from the table. The positions index into the row's <w:t> elements in the order:
+		date, student, sport, course, startTime, endTime, hours
+	"""
+	from docx.enum.text import WD_ALIGN_PARAGRAPH
+	from docx.enum.table import WD_ALIGN_VERTICAL
+	from docx.shared import Inches
+	from docx.oxml.ns import qn
+	newRow = table.add_row()
+	newRow.height = Inches(0.4)
+	rowCells = newRow.cells
+	placeholders = []
+	for i in list(range(6))+[7]:
+		rowCells[i].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+		if not i == 1:
+			rowCells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER # otherwise LEFT
+		txtrun = rowCells[i].paragraphs[0].add_run('@'+str(i))
+		if i == 0:
+			txtrun.bold = False # formatting is only applied to text when using runs
+		placeholders.append('@'+str(i))
+
+	tr = newRow._tr
+	tr.getparent().remove(tr)
+	textNodes = list(tr.iter(qn('w:t')))
+	for t in textNodes:
+		t.set(qn('xml:space'), 'preserve') # keep any spaces in names as given
+	nodeTexts = [t.text for t in textNodes]
+	return tr, [nodeTexts.index(text) for text in placeholders]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def findFullName(lastName, namesList, sport='', course=''):
+	"""Given a last name and a Roster or list of names, returns the full name (see roster.py)"""
+	if not isinstance(namesList, Roster):
+		namesList = Roster.fromLines('', namesList)
+	return namesList.fullName(lastName, sport, course)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def namesFile2roster(namesFile):
+	"""Given a text file of names, returns a Roster of the tutor and students indexed by last name"""
+	return loadRoster(namesFile)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def namesFile2list(namesFile):
@@ -208,16 +388,8 @@ def namesFile2list(namesFile):
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def checkFormat(namesFile):
 	"""Checks the format of the file of names, returns True or False"""
-	tutorLine, studentLine = False, False
-	with open(namesFile, 'r') as nfile:
-		for line in nfile:
-			if not len(line) == 0:
-				line = line.strip()
-				if line == 'tutor:':
-					tutorLine = True
-				elif line == 'students:':
-					studentLine = True
-	return tutorLine and studentLine
+	# the roster is kept once loaded, so the file isn't read again to use it
+	return loadRoster(namesFile) is not None
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def main():
@@ -233,8 +405,21 @@ def main():
 		default='none',
 		help="""The input (.txt) file of tutor's name followed by students' names"""
 	)
+	argParser.add_argument(
+		"--stream",
+		action='store_true',
+		help="""Write the document as the meetings are read, for very large timesheets"""
+	)
+	argParser.add_argument(
+		"--profile",
+		nargs='?',
+		const='',
+		default=None,
+		metavar='PROFFILE',
+		help="""Print the time taken by each stage, and save cProfile statistics to PROFFILE if given"""
+	)
 	args = argParser.parse_args()
-	csv2timesheet(args.inputCSV, args.namesFile)
+	profiled(args.profile, csv2timesheet, args.inputCSV, args.namesFile, args.stream)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""Date Window
+
+This module reads the window of dates given on the command line, formatted as:
+	MM/DD/YYYY
+It only imports datetime, so scripts that just pass the window on (such as
+timesheetClient.py) don't load the calendar and timesheet modules to read it.
+
+The following functions are available:
+	* dateStr2Obj - given a date string, returns a datetime object
+	* resolveWindow - given the starting and ending dates from the command line, returns
+	  the ending date to use
+"""
+
+from datetime import date, timedelta
+
+def dateStr2Obj(datestring):
+	"""Given a date string formatted as "MM/DD/YYYY", returns a date object"""
+	if not datestring.count('/') == 2:
+		print("Date must be formatted as MM/DD/YYYY\n")
+	else:
+		dateSplit = datestring.split('/')
+		month = int(dateSplit[0])
+		day = int(dateSplit[1])
+		year = int(dateSplit[2])
+		try:
+			dateObj = date(month=month, day=day, year=year)
+		except ValueError:
+			print("Undefined date given: ",datestring,"\n")
+		return dateObj
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def resolveWindow(startDate, endDate):
+	"""Given the starting and ending dates from the command line, returns the ending date to use
+
+	If only the starting date is set, the window is 2 weeks from it. Dates are formatted
+	as: MM/DD/YYYY
+	"""
+	# if startDate is set and not endDate, set endDate to 2 weeks past the startDate
+	if (not startDate == '01/01/1970' and endDate == '12/31/9999'):
+		endObj = dateStr2Obj(startDate) + timedelta(days=13) # 13 to exclude 3rd instance of starting day
+	else:
+		endObj = dateStr2Obj(endDate)
+	return str(endObj.month)+'/'+str(endObj.day)+'/'+str(endObj.year)
@@ -0,0 +1,237 @@
+#!/usr/bin/python3
+"""Parsed Calendar Cache
+
+This module keeps the meetings parsed from a calendar file (.ics) on disk so that a
+calendar which hasn't changed since the last run doesn't have to be tokenized again.
+Cached calendars are stored under a cache directory as:
+	[content hash].pickle
+where the content hash is the SHA-256 of the (.ics) file. An index file records the
+size, modification time and hash last seen for each calendar path, so an unchanged
+file is matched by its size and modification time without being read at all.
+
+When a calendar has changed, the meetings cached for its previous contents are
+handed to the parse function so unchanged events can be carried over instead of
+parsed again (see calendar2csv.parseCalendar). The recurrence occurrences expanded
+for the last window of each calendar are also kept, in:
+	expansions_[path hash].pickle
+
+The cache directory defaults to ~/.cache/CATStutorTools and can be changed with the
+CATS_CACHE_DIR environment variable. Once the cached calendars grow past
+MAX_CACHE_BYTES, the least recently used ones are removed.
+
+Calendars loaded by a process are also kept in its memory, up to MAX_LOADED of them,
+so a long running process (the GUI or timesheetGen.py --serve) only looks at the
+file's size and modification time to reuse a calendar it has already loaded.
+
+The following functions are available:
+	* loadMeetings - given a calendar file and parse function, returns its meetings
+	* loadExpansions - given a calendar file, returns its stored recurrence expansions
+	* saveExpansions - given a calendar file and recurrence expansions, stores them
+	* fileHash - given a file, returns the SHA-256 of its contents
+	* clearCache - removes all cached calendars
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+CACHE_DIR = os.environ.get('CATS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'CATStutorTools'))
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+MAX_LOADED = 32 # calendars kept in memory by a process
+CACHE_VERSION = 2 # increase when the format of parsed meetings changes
+INDEX_NAME = 'index.json'
+
+# calendars loaded by this process by absolute path: (size, mtime, meetings), oldest first
+_loaded = {}
+_loadedLock = threading.Lock()
+
+def loadMeetings(inputICS, parseFunc, cacheDir=None):
+	"""Given a calendar (.ics) file, returns its list of meetings from the cache or parseFunc
+
+	Parameters
+	~~~~~~~~~~
+	inputICS : str
+		The input Google calendar (.ics) file
+	parseFunc : function
+		Called as parseFunc(inputICS, previous) to parse the calendar if it isn't cached,
+		where previous is the list of meetings cached for the file's last contents or None
+	cacheDir : str, optional
+		The cache directory, CACHE_DIR if not given
+
+	Returns
+	~~~~~~~
+	list
+		The meetings returned by parseFunc for the current contents of inputICS
+	"""
+	path = os.path.abspath(inputICS)
+	stat = os.stat(path)
+	with _loadedLock:
+		entry = _loaded.get(path)
+	if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+		return entry[2]
+
+	meetings = _loadMeetings(inputICS, parseFunc, cacheDir)
+	with _loadedLock:
+		_loaded.pop(path, None)
+		_loaded[path] = (stat.st_size, stat.st_mtime_ns, meetings)
+		while len(_loaded) > MAX_LOADED:
+			del _loaded[next(iter(_loaded))]
+	return meetings
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _loadMeetings(inputICS, parseFunc, cacheDir):
+	"""loads the meetings of a calendar from the cache directory, parsing and storing them if missing"""
+	if cacheDir is None:
+		cacheDir = CACHE_DIR
+	try:
+		os.makedirs(cacheDir, exist_ok=True)
+		contentHash, previousHash = _lookupHash(inputICS, cacheDir)
+	except OSError:
+		return parseFunc(inputICS, None) # cache unavailable, parse without it
+
+	cacheFile = os.path.join(cacheDir, contentHash+'.pickle')
+	meetings = _load(cacheFile)
+	if meetings is not None:
+		os.utime(cacheFile) # mark as recently used
+		return meetings
+
+	# missing, corrupt or outdated cache entry; unchanged events are taken from the last parse
+	previous = None
+	if previousHash is not None:
+		previous = _load(os.path.join(cacheDir, previousHash+'.pickle'))
+	meetings = parseFunc(inputICS, previous)
+	_store(cacheFile, meetings)
+	_evict(cacheDir)
+	return meetings
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def loadExpansions(inputICS, cacheDir=None):
+	"""Given a calendar (.ics) file, returns the dictionary of expansions stored by saveExpansions"""
+	expansions = _load(_expansionsFile(inputICS, cacheDir))
+	if expansions is None:
+		return {}
+	return expansions
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def saveExpansions(inputICS, expansions, cacheDir=None):
+	"""Given a calendar (.ics) file and dictionary of recurrence expansions, stores them for the next run"""
+	try:
+		expansionsFile = _expansionsFile(inputICS, cacheDir)
+		os.makedirs(os.path.dirname(expansionsFile), exist_ok=True)
+	except OSError:
+		return
+	_store(expansionsFile, expansions)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fileHash(fname):
+	"""Given a file name, returns the SHA-256 hex digest of its contents"""
+	digest = hashlib.sha256()
+	with open(fname, 'rb') as infile:
+		for chunk in iter(lambda: infile.read(1024*1024), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def clearCache(cacheDir=None):
+	"""Removes all cached calendars and the index from the cache directory, and those kept in memory"""
+	with _loadedLock:
+		_loaded.clear()
+	if cacheDir is None:
+		cacheDir = CACHE_DIR
+	if not os.path.isdir(cacheDir):
+		return
+	for fname in os.listdir(cacheDir):
+		if fname.endswith('.pickle') or fname == INDEX_NAME:
+			os.remove(os.path.join(cacheDir, fname))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _lookupHash(inputICS, cacheDir):
+	"""Returns (content hash, previous hash) of inputICS, reusing the indexed hash if size and mtime match
+
+	The previous hash is that of the contents last seen at the same path if they differ,
+	otherwise None.
+	"""
+	path = os.path.abspath(inputICS)
+	stat = os.stat(path)
+	indexFile = os.path.join(cacheDir, INDEX_NAME)
+	try:
+		with open(indexFile, 'r') as index:
+			entries = json.load(index)
+	except (OSError, ValueError):
+		entries = {}
+
+	entry = entries.get(path)
+	if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+		return entry[2], None
+
+	contentHash = fileHash(path)
+	previousHash = None
+	if entry and not entry[2] == contentHash:
+		previousHash = entry[2]
+	entries[path] = [stat.st_size, stat.st_mtime_ns, contentHash]
+	tmpFile = _tmpName(indexFile)
+	with open(tmpFile, 'w') as index:
+		json.dump(entries, index)
+	os.replace(tmpFile, indexFile)
+	return contentHash, previousHash
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _load(cacheFile):
+	"""Returns the contents stored in cacheFile, or None if missing, corrupt or outdated"""
+	try:
+		with open(cacheFile, 'rb') as cached:
+			version, contents = pickle.load(cached)
+	except (OSError, pickle.PickleError, EOFError, ValueError, TypeError, AttributeError, ImportError):
+		return None
+	if not version == CACHE_VERSION:
+		return None
+	return contents
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _expansionsFile(inputICS, cacheDir):
+	"""Returns the name of the file holding the stored expansions of inputICS"""
+	if cacheDir is None:
+		cacheDir = CACHE_DIR
+	pathHash = hashlib.sha256(os.path.abspath(inputICS).encode('utf-8')).hexdigest()[:16]
+	return os.path.join(cacheDir, 'expansions_'+pathHash+'.pickle')
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _store(cacheFile, contents):
+	"""Writes contents to cacheFile, replacing it in one step so readers never see a partial file"""
+	tmpFile = _tmpName(cacheFile)
+	try:
+		with open(tmpFile, 'wb') as cached:
+			pickle.dump((CACHE_VERSION, contents), cached, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tmpFile, cacheFile)
+	except OSError:
+		if os.path.exists(tmpFile):
+			os.remove(tmpFile)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _evict(cacheDir, maxBytes=None):
+	"""Removes the least recently used cached calendars until they fit in maxBytes"""
+	if maxBytes is None:
+		maxBytes = MAX_CACHE_BYTES
+	entries = []
+	total = 0
+	for fname in os.listdir(cacheDir):
+		if fname.endswith('.pickle'):
+			stat = os.stat(os.path.join(cacheDir, fname))
+			entries.append((stat.st_mtime, stat.st_size, fname))
+			total += stat.st_size
+	entries.sort()
+	for mtime, size, fname in entries:
+		if total <= maxBytes:
+			break
+		try:
+			os.remove(os.path.join(cacheDir, fname))
+		except OSError:
+			pass
+		total -= size
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _tmpName(fname):
+	"""Returns a temporary name for writing fname, unique to this process and thread"""
+	return fname+'.'+str(os.getpid())+'.'+str(threading.get_ident())
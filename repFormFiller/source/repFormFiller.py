@@ -9,14 +9,26 @@
 	requires:
 		* the following files to be in the runpath of timesheetGen.py:
 			* calendar2csv.py
+			* icsTokenizer.py
+			* icsIndex.py
+			* simpleRule.py
+			* icsCache.py
+			* session.py
+			* roster.py
 			* csv2timesheet.py
+			* templateCache.py
+			* docxStream.py
+			* stageTimer.py
+			* sessionTable.py
+			* dateWindow.py
+		* NumPy, used to gather each student's sessions (see sessionTable.py)
 """
 import sys
-import csv
 import argparse
 from datetime import date
-from calendar2csv import calendar2csv as cal2csv
-from csv2timesheet import namesFile2list as nfile2list
+from calendar2csv import calendar2sessions as cal2sessions
+from csv2timesheet import namesFile2roster as nfile2roster
+from stageTimer import currentTimer, profiled
 
 def _printList(studentList):
 	for stu in studentList:
@@ -56,46 +68,37 @@ def repFormFiller(inputICS, namesFile='none'):
 	fullNames = []
 	tutor = []
 	if not namesFile == 'none':
-		namesList = nfile2list(namesFile)
-		tutorSplit, fullNamesStrings = namesList[0].split(','), namesList[1]
-		tutor = [tutorSplit[1].strip(), tutorSplit[0]]
-		for name in fullNamesStrings:
-			fullNames.append(name.split(','))
+		roster = nfile2roster(namesFile)
+		tutor = [roster.tutor.firstName, roster.tutor.lastName]
+		for stu in roster.students:
+			fullNames.append([stu.lastName, stu.firstName])
 
-	# generate csv file of meetings from input calendar file
+	# generate list of meetings from input calendar file
 	todayDate = date.today()
 	todayDateStr = todayDate.strftime("%m/%d/%y")
 	print(todayDateStr)
-	inputCSV = cal2csv(inputICS, todayDateStr)
+	sessions = cal2sessions(inputICS, todayDateStr)
 	
-	with open(inputCSV, 'r') as inCSV, open('outputJS.js', 'w') as outputText:
-		csvReader = csv.reader(inCSV)
-		for row in csvReader:
-			if not len(row) == 0 and not row[0] == "Date":	# skip past csv header and blank rows
-				lastName, sport, className, startTime = [row[1], row[2], row[3], row[4]]
+	# students gathered and Javascript written as one stage when the run is profiled
+	with currentTimer().stage('js'), open('outputJS.js', 'w') as outputText:
+		from sessionTable import SessionTable, firstSeen
+		table = SessionTable.fromSessions(sessions)
+		# sessions of each student, with students in the order they first appear
+		for studentCode, rows in enumerate(table.groups('student')):
+			sport = table.sports[table.sportCodes[rows[0]]]
 
-				# replace any "M/W" in sport with "Men's/Women's"
-				if sport.startswith("W ") or sport.startswith("M "):
-					sportSplit = sport.split(' ')
-					if sportSplit[0] == 'W':
-						sport = "Women's " + sportSplit[1]
-					else:
-						sport = "Men's " + sportSplit[1]
+			# replace any "M/W" in sport with "Men's/Women's"
+			if sport.startswith("W ") or sport.startswith("M "):
+				sportSplit = sport.split(' ')
+				if sportSplit[0] == 'W':
+					sport = "Women's " + sportSplit[1]
+				else:
+					sport = "Men's " + sportSplit[1]
 
-				# if not already there, add student to list of students
-				if next((stu for stu in students if stu['lastName'] == lastName), None) == None:
-					newStudent = {'lastName': lastName, 'sport': sport, 'classNames': [], 'startTimes': []}
-					students.append(newStudent)
-
-				# add startTime of session
-				for stu in students:
-					if stu['lastName'] == lastName:
-						# append startTime to list of start times for student
-						if startTime not in stu['startTimes']:
-							stu['startTimes'].append(startTime)
-						# append className to list of classes for student
-						if className not in stu['classNames']:
-							stu['classNames'].append(className)
+			# start times and classes of the student, each listed once in the order they first appear
+			startTimes = ['%02d:%02d' % divmod(int(minute), 60) for minute in firstSeen(table.startMinutes[rows] % 1440)]
+			classNames = [table.courses[code] for code in firstSeen(table.courseCodes[rows])]
+			students.append({'lastName': table.students[studentCode], 'sport': sport, 'classNames': classNames, 'startTimes': startTimes})
 
 		#_printList(students)
 
@@ -277,7 +280,15 @@ if __name__ == "__main__":
 		default='none',
 		help="""The input (.txt) file of tutor's name followed by students' names"""
 	)
+	argParser.add_argument(
+		"--profile",
+		nargs='?',
+		const='',
+		default=None,
+		metavar='PROFFILE',
+		help="""Print the time taken by each stage, and save cProfile statistics to PROFFILE if given"""
+	)
 	args = argParser.parse_args()
 
 
-	repFormFiller(args.inputICS, args.namesFile)
\ No newline at end of file
+	profiled(args.profile, repFormFiller, args.inputICS, args.namesFile)
\ No newline at end of file
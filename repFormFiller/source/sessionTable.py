@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""Session Table
+
+This module holds a list of sessions (see session.py) as columns of NumPy arrays, so
+hours, totals and sums by student, sport or course are each a single vectorized
+operation rather than a loop over the sessions. Starting and ending times are kept as
+whole minutes since 01/01/1970 (local to the calendar, as the sessions' times are),
+and the student, sport and course names as integer codes into lists of the names in
+the order they first appear:
+	students[studentCodes[i]] is the student of the i-th session
+
+Since hours are computed from whole minutes, totals are exact sums of minutes divided
+once by 60 instead of floats added up session by session.
+
+The timesheet (see csv2timesheet.py) and the report form filler compute their hours,
+totals and lists of students from a SessionTable.
+
+The following are available:
+	* SessionTable - the columns of a list of sessions
+	* SessionTable.fromSessions - given an iterable of sessions, returns their table
+	* firstSeen - given an array, returns its distinct values in the order they first appear
+	* NO_END - the ending minute of a session without times
+"""
+
+from datetime import datetime
+import numpy as np
+
+NO_END = np.iinfo(np.int64).min # ending minute of a meeting without times
+EPOCH = datetime(1970, 1, 1)
+COLUMNS = ('student', 'sport', 'course') # categorical columns
+
+class SessionTable:
+	"""The sessions of a window as columns of NumPy arrays
+
+	Attributes
+	~~~~~~~~~~
+	startMinutes : numpy.ndarray
+		The starting time of each session, in minutes since 01/01/1970
+	endMinutes : numpy.ndarray
+		The ending time of each session, in minutes since 01/01/1970, NO_END if it has no times
+	studentCodes, sportCodes, courseCodes : numpy.ndarray
+		The index of each session's student, sport and course in students, sports and courses
+	students, sports, courses : list
+		The names of each column, in the order they first appear
+	"""
+
+	def __init__(self, startMinutes, endMinutes, studentCodes, sportCodes, courseCodes, students, sports, courses):
+		self.startMinutes = startMinutes
+		self.endMinutes = endMinutes
+		self.studentCodes = studentCodes
+		self.sportCodes = sportCodes
+		self.courseCodes = courseCodes
+		self.students = students
+		self.sports = sports
+		self.courses = courses
+
+	@classmethod
+	def fromSessions(cls, sessions):
+		"""Given an iterable of sessions, returns a SessionTable of them in the same order"""
+		starts, ends = [], []
+		codes = {'student': {}, 'sport': {}, 'course': {}}
+		studentCodes, sportCodes, courseCodes = [], [], []
+		for session in sessions:
+			starts.append(_minutes(session.start))
+			ends.append(NO_END if session.end is None else _minutes(session.end))
+			studentCodes.append(codes['student'].setdefault(session.student, len(codes['student'])))
+			sportCodes.append(codes['sport'].setdefault(session.sport, len(codes['sport'])))
+			courseCodes.append(codes['course'].setdefault(session.course, len(codes['course'])))
+		return cls(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+			np.array(studentCodes, dtype=np.int32), np.array(sportCodes, dtype=np.int32), np.array(courseCodes, dtype=np.int32),
+			list(codes['student']), list(codes['sport']), list(codes['course']))
+
+	def __len__(self):
+		return len(self.startMinutes)
+
+	@property
+	def minutes(self):
+		"""The length of each session in minutes, 0 for sessions without times"""
+		return np.where(self.endMinutes == NO_END, 0, self.endMinutes - self.startMinutes)
+
+	@property
+	def hours(self):
+		"""The length of each session in hours, 0 for sessions without times"""
+		return self.minutes / 60
+
+	def totalHours(self):
+		"""Returns the total hours of the sessions"""
+		return int(self.minutes.sum()) / 60
+
+	def hoursBy(self, column):
+		"""Given 'student', 'sport' or 'course', returns a dictionary of the total hours of each name"""
+		names, codes = self._column(column)
+		sums = np.bincount(codes, weights=self.minutes, minlength=len(names))
+		return {name: float(total) / 60 for name, total in zip(names, sums)}
+
+	def countsBy(self, column):
+		"""Given 'student', 'sport' or 'course', returns a dictionary of the number of sessions of each name"""
+		names, codes = self._column(column)
+		counts = np.bincount(codes, minlength=len(names))
+		return {name: int(count) for name, count in zip(names, counts)}
+
+	def where(self, student=None, sport=None, course=None):
+		"""Returns a boolean mask of the sessions with the given student, sport and course, any if None"""
+		mask = np.ones(len(self), dtype=bool)
+		for column, name in (('student', student), ('sport', sport), ('course', course)):
+			if name is not None:
+				names, codes = self._column(column)
+				mask &= codes == (names.index(name) if name in names else -1)
+		return mask
+
+	def between(self, startDate, endDate):
+		"""Given starting and ending dates, returns a boolean mask of the sessions starting between them"""
+		first = _minutes(datetime.combine(startDate, datetime.min.time()))
+		last = _minutes(datetime.combine(endDate, datetime.min.time())) + 24*60
+		return (self.startMinutes >= first) & (self.startMinutes < last)
+
+	def select(self, mask):
+		"""Given a boolean mask or array of indices, returns a SessionTable of those sessions"""
+		return SessionTable(self.startMinutes[mask], self.endMinutes[mask], self.studentCodes[mask],
+			self.sportCodes[mask], self.courseCodes[mask], self.students, self.sports, self.courses)
+
+	def groups(self, column):
+		"""Given 'student', 'sport' or 'course', returns a list of the indices of each name's sessions, in order
+
+		An empty table has no names, so no groups.
+		"""
+		names, codes = self._column(column)
+		if len(names) == 0:
+			return [] # np.split would return a single empty group
+		order = np.argsort(codes, kind='stable') # sessions of each code stay in their order
+		return np.split(order, np.cumsum(np.bincount(codes, minlength=len(names)))[:-1])
+
+	def _column(self, column):
+		"""returns (names, codes) of a categorical column"""
+		if column not in COLUMNS:
+			raise ValueError("Unknown session column: "+str(column))
+		return getattr(self, column+'s'), getattr(self, column+'Codes')
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def firstSeen(values):
+	"""Given an array, returns an array of its distinct values in the order they first appear"""
+	distinct, first = np.unique(values, return_index=True)
+	return distinct[np.argsort(first)]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _minutes(dt):
+	"""returns a datetime as whole minutes since 01/01/1970"""
+	return (dt.toordinal() - EPOCH.toordinal())*1440 + dt.hour*60 + dt.minute
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+"""Stage Timer
+
+This module times the stages of a run, such as tokenizing the calendar, expanding
+recurring meetings and building the timesheet, for the --profile option of the
+command line tools. Each stage's wall and CPU time is added up under its name, along
+with counts such as the number of events and sessions, and a breakdown is printed
+at the end of the run.
+
+Stages are timed through the current timer:
+	with currentTimer().stage('expand'):
+		...
+	currentTimer().count('sessions', len(sessions))
+Unless a run is profiled, the current timer is a null timer whose stages and counts
+do nothing, so timing costs nothing when --profile isn't given. Each thread has its
+own current timer, so a run on a worker thread is timed apart from the rest.
+
+A ProgressTimer also reports each stage as it starts, which the GUI uses to drive its
+progress bar, and stops the run at the next stage or count once it is cancelled. The
+long stages count each event expanded and each row filled as they go, so a cancel
+stops them part way rather than once they finish.
+
+The following are available:
+	* StageTimer - adds up the wall and CPU time of named stages and counts
+	* ProgressTimer - a StageTimer reporting stages as they start, that can be cancelled
+	* Cancelled - raised in a run whose ProgressTimer was cancelled
+	* currentTimer - returns the timer of the run in progress, or the null timer
+	* usingTimer - makes a timer the current timer of this thread for the enclosed block
+	* profiled - given a function, runs it with a timer and prints the breakdown
+"""
+
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+class StageTimer:
+	"""The wall and CPU time of each named stage of a run, with counts of what was processed"""
+
+	def __init__(self):
+		self.stages = {} # name -> [wall, cpu, calls], in the order first entered
+		self.counts = {}
+
+	@contextmanager
+	def stage(self, name):
+		"""Times the enclosed block, adding it to the stage of the given name"""
+		wall0, cpu0 = time.perf_counter(), time.process_time()
+		try:
+			yield
+		finally:
+			entry = self.stages.setdefault(name, [0.0, 0.0, 0])
+			entry[0] += time.perf_counter() - wall0
+			entry[1] += time.process_time() - cpu0
+			entry[2] += 1
+
+	def count(self, name, num=1):
+		"""Adds num to the count of the given name"""
+		self.counts[name] = self.counts.get(name, 0) + num
+
+	def report(self, totalWall=None, totalCPU=None):
+		"""Prints the time of each stage and the counts"""
+		print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+		print("%-14s %10s %10s %8s %7s" % ('stage', 'wall (s)', 'cpu (s)', 'calls', 'wall %'))
+		for name, (wall, cpu, calls) in self.stages.items():
+			share = '%6.1f%%' % (100*wall/totalWall) if totalWall else ''
+			print("%-14s %10.4f %10.4f %8d %7s" % (name, wall, cpu, calls, share))
+		if totalWall is not None:
+			print("%-14s %10.4f %10.4f" % ('total', totalWall, totalCPU))
+		for name, num in self.counts.items():
+			print("%-14s %10d" % (name, num))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class Cancelled(Exception):
+	"""Raised in a run whose ProgressTimer was cancelled"""
+
+class ProgressTimer(StageTimer):
+	"""A StageTimer that calls back with each stage's name as it starts and can be cancelled
+
+	Parameters
+	~~~~~~~~~~
+	callback : function
+		Called with the name of each stage as it starts, on the thread of the run
+	cancelEvent : threading.Event, optional
+		Once set, the next stage or count raises Cancelled
+	"""
+
+	def __init__(self, callback, cancelEvent=None):
+		super().__init__()
+		self.callback = callback
+		self.cancelEvent = cancelEvent
+
+	@contextmanager
+	def stage(self, name):
+		self._checkCancel()
+		self.callback(name)
+		with StageTimer.stage(self, name):
+			yield
+
+	def count(self, name, num=1):
+		self._checkCancel()
+		StageTimer.count(self, name, num)
+
+	def _checkCancel(self):
+		if self.cancelEvent is not None and self.cancelEvent.is_set():
+			raise Cancelled()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class _NullTimer:
+	"""A timer that records nothing, used when a run isn't profiled"""
+	_context = nullcontext()
+
+	def stage(self, name):
+		return self._context
+
+	def count(self, name, num=1):
+		pass
+
+_NULL_TIMER = _NullTimer()
+_local = threading.local() # current timer of each thread
+
+def currentTimer():
+	"""Returns the StageTimer of this thread's run in progress, or a timer that records nothing"""
+	return getattr(_local, 'timer', _NULL_TIMER)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@contextmanager
+def usingTimer(timer):
+	"""Makes timer the current timer of this thread for the enclosed block"""
+	previous = currentTimer()
+	_local.timer = timer
+	try:
+		yield timer
+	finally:
+		_local.timer = previous
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def profiled(profile, func, *args, **kwargs):
+	"""Given the --profile argument and a function, runs the function and returns its result
+
+	Parameters
+	~~~~~~~~~~
+	profile : str or None
+		None to run func as is; otherwise the stages of func are timed and printed, and if
+		profile is a file name, cProfile statistics of the run are also saved to it (.prof)
+	func : function
+		The function to run, called with the remaining arguments
+	"""
+	if profile is None:
+		return func(*args, **kwargs)
+	timer = StageTimer()
+	profiler = None
+	if profile:
+		import cProfile
+		profiler = cProfile.Profile()
+	wall0, cpu0 = time.perf_counter(), time.process_time()
+	try:
+		with usingTimer(timer):
+			if profiler is not None:
+				return profiler.runcall(func, *args, **kwargs)
+			return func(*args, **kwargs)
+	finally:
+		totalWall, totalCPU = time.perf_counter()-wall0, time.process_time()-cpu0
+		timer.report(totalWall, totalCPU)
+		if profiler is not None:
+			profiler.dump_stats(profile)
+			print("Profile saved to: ", profile)
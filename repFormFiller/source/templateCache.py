@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""Timesheet Template Cache
+
+This module loads the MSWord template "timesheetTemplate.docx" once per process and
+hands out a copy of it for every timesheet generated. Opening the template with
+python-docx unzips the package and parses all of its XML parts; a copy of the
+already parsed document skips both. The pristine document is never handed out
+itself, so each timesheet starts from an unmodified template.
+
+The template is loaded again automatically if the file's size or modification
+time changes on disk.
+
+The following functions are available:
+	* loadTemplate - returns a fresh copy of the template document
+	* clearTemplates - forgets all loaded templates
+"""
+
+import os
+import io
+import threading
+from copy import deepcopy
+
+TEMPLATE_FILE = 'timesheetTemplate.docx'
+
+# loaded templates by absolute path: (size, mtime, file contents, parsed document)
+_templates = {}
+_lock = threading.Lock()
+
+def loadTemplate(templateFile=TEMPLATE_FILE):
+	"""Given the template file name, returns a copy of the template document that may be modified
+
+	Parameters
+	~~~~~~~~~~
+	templateFile : str, optional
+		The MSWord template document, "timesheetTemplate.docx" in the runpath by default
+
+	Returns
+	~~~~~~~
+	Document
+		A python-docx document identical to the template
+	"""
+	from docx import Document # imported on first use, so the tools start without it
+	path = os.path.abspath(templateFile)
+	stat = os.stat(path)
+	with _lock:
+		entry = _templates.get(path)
+		if entry is None or not (entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns):
+			with open(path, 'rb') as infile:
+				blob = infile.read()
+			entry = (stat.st_size, stat.st_mtime_ns, blob, Document(io.BytesIO(blob)))
+			_templates[path] = entry
+		try:
+			return deepcopy(entry[3])
+		except Exception:
+			# fall back to parsing the in-memory package if the document can't be copied
+			return Document(io.BytesIO(entry[2]))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def clearTemplates():
+	"""Forgets all loaded templates so they are read from disk on next use"""
+	with _lock:
+		_templates.clear()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""Streaming MSWord Document Writer
+
+This module writes a MSWord document (.docx) without holding its body in memory.
+A (.docx) file is a zip package of XML parts; every part of the template document
+except the body, "word/document.xml", is copied into the output package unchanged,
+and the body is written from an iterable of byte chunks as they are produced.
+
+The following functions are available:
+	* writeDocx - given a template, output file name and body chunks, writes the document
+	* splitTemplate - given an XML fragment with numbered placeholders, returns its parts
+	* fillTemplate - given the parts of a fragment and text values, returns the filled fragment
+"""
+
+import re
+import shutil
+
+DOCUMENT_PART = 'word/document.xml'
+
+def writeDocx(templateFile, outFile, documentChunks):
+	"""Given a template (.docx), output file name and iterable of bytes, writes the output document
+
+	Parameters
+	~~~~~~~~~~
+	templateFile : str
+		The MSWord document whose parts, other than the body, are copied to the output
+	outFile : str
+		The name of the output document
+	documentChunks : iterable
+		Chunks of bytes that together make up the "word/document.xml" part
+	"""
+	import zipfile # imported on first use, so importing this module stays quick
+	with zipfile.ZipFile(templateFile, 'r') as zin, zipfile.ZipFile(outFile, 'w', zipfile.ZIP_DEFLATED) as zout:
+		for info in zin.infolist():
+			outInfo = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+			outInfo.compress_type = zipfile.ZIP_DEFLATED
+			with zout.open(outInfo, 'w', force_zip64=True) as part:
+				if info.filename == DOCUMENT_PART:
+					for chunk in documentChunks:
+						part.write(chunk)
+				else:
+					with zin.open(info, 'r') as templatePart:
+						shutil.copyfileobj(templatePart, part)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def splitTemplate(fragment, marker=b'@'):
+	"""Given an XML fragment (bytes) containing placeholders such as "@0", returns its parts
+
+	The returned list alternates between literal bytes and the integer number of the
+	placeholder that follows them, always beginning and ending with literal bytes.
+	"""
+	pieces = re.split(re.escape(marker)+rb'([0-9])', fragment)
+	return [int(piece) if i % 2 else piece for i, piece in enumerate(pieces)]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fillTemplate(parts, values):
+	"""Given the parts from splitTemplate and a mapping of placeholder number to text, returns bytes"""
+	out = []
+	for i, part in enumerate(parts):
+		if i % 2:
+			out.append(_escape(values[part]).encode('utf-8'))
+		else:
+			out.append(part)
+	return b''.join(out)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _escape(text):
+	"""returns text with the characters special to XML escaped (as xml.sax.saxutils.escape, which imports urllib)"""
+	return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+"""ICS Event Index
+
+This module finds the events of a calendar file (.ics) without decoding it. The file
+is memory-mapped and the byte offsets of each:
+	BEGIN:VEVENT
+	...
+	END:VEVENT
+are found with bytes-level searches, giving a compact index of two offsets per event.
+Each event is then checked at the byte level against a window of dates, and only the
+events that could hold a CATS tutor meeting within the window are decoded and handed
+to the tokenizer (see icsTokenizer.py). Most of a large export, such as the years of
+personal events before a semester, is then never decoded at all.
+
+An event is kept (a candidate) unless it can be ruled out by its bytes:
+	* its SUMMARY has no '-', so it can't be formatted as:
+		tutorLastName-studentLastName-Course-Sport
+	* it doesn't recur, and its DTSTART date is outside the window
+	* it recurs, and its DTSTART date is after the window or its UNTIL date before it
+Events with a RECURRENCE-ID are always kept, since an override moved out of the window
+still removes the occurrence it replaces. Anything that can't be read at the byte
+level is kept and left to the tokenizer, so the candidates are never missing an event
+the full parse would have included. Property names are matched as written by Google
+Calendar (upper-case).
+
+The index of a file is kept in memory by path, size and modification time, so the
+same calendar scanned again for another window isn't searched again.
+
+The following functions are available:
+	* scanEvents - given a calendar file and window dates, yields the lines of each candidate event
+	* indexEvents - given the bytes of a calendar, returns the offsets of its events
+	* eventIndex - given a calendar file and its mapped bytes, returns its (cached) offsets
+	* isCandidate - given the bytes of an event and window, returns False if it can be ruled out
+	* clearIndexes - removes the indexes kept in memory
+"""
+
+import os
+import mmap
+import threading
+from array import array
+from icsTokenizer import unfoldLines
+
+BEGIN_EVENT = b'BEGIN:VEVENT'
+END_EVENT = b'END:VEVENT'
+MAX_INDEXED = 32 # indexes of calendars kept in memory
+
+# event offsets of calendars by absolute path: (size, mtime, offsets), oldest first
+_indexes = {}
+_indexesLock = threading.Lock()
+
+def scanEvents(inputICS, startDate, endDate):
+	"""Given a calendar (.ics) file and window dates, yields the content lines of each candidate event
+
+	Parameters
+	~~~~~~~~~~
+	inputICS : str
+		The input Google calendar (.ics) file
+	startDate : date
+		The first date of the window
+	endDate : date
+		The last date of the window
+
+	Yields
+	~~~~~~
+	list
+		The unfolded content lines inside each candidate VEVENT, as yielded by
+		icsTokenizer.iterEventLines
+	"""
+	windowStart = startDate.strftime('%Y%m%d').encode('ascii')
+	windowEnd = endDate.strftime('%Y%m%d').encode('ascii')
+	with open(inputICS, 'rb') as icsFile:
+		if os.fstat(icsFile.fileno()).st_size == 0:
+			return # an empty file can't be mapped
+		with mmap.mmap(icsFile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+			offsets = eventIndex(inputICS, buf)
+			for i in range(0, len(offsets), 2):
+				event = buf[offsets[i]:offsets[i+1]]
+				if isCandidate(event, windowStart, windowEnd):
+					yield list(unfoldLines(event.decode('utf-8', 'replace').split('\n')))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def eventIndex(inputICS, buf):
+	"""Given a calendar (.ics) file and its mapped bytes, returns its event offsets, indexing it if changed"""
+	path = os.path.abspath(inputICS)
+	stat = os.stat(path)
+	with _indexesLock:
+		entry = _indexes.get(path)
+	if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+		return entry[2]
+
+	offsets = indexEvents(buf)
+	with _indexesLock:
+		_indexes.pop(path, None)
+		_indexes[path] = (stat.st_size, stat.st_mtime_ns, offsets)
+		while len(_indexes) > MAX_INDEXED:
+			del _indexes[next(iter(_indexes))]
+	return offsets
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def clearIndexes():
+	"""Removes the event indexes kept in memory"""
+	with _indexesLock:
+		_indexes.clear()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def indexEvents(buf):
+	"""Given the bytes of a calendar, returns an array of [start, end) offsets of each event's content
+
+	Each event's content runs from the newline ending its BEGIN:VEVENT line to the newline
+	before END:VEVENT, so every content line follows a newline. The offsets of the i-th
+	event are offsets[2*i] and offsets[2*i+1].
+	An event missing its END:VEVENT at the end of the file is left out, as the
+	tokenizer does.
+	"""
+	offsets = array('q')
+	pos = 0 if buf[:len(BEGIN_EVENT)] == BEGIN_EVENT else buf.find(b'\n'+BEGIN_EVENT)
+	while pos != -1:
+		start = buf.find(b'\n', pos+1)
+		if start == -1:
+			break
+		end = buf.find(b'\n'+END_EVENT, start)
+		if end == -1:
+			break
+		offsets.append(start)
+		offsets.append(end)
+		pos = buf.find(b'\n'+BEGIN_EVENT, end+1)
+	return offsets
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def isCandidate(event, windowStart, windowEnd):
+	"""Given the bytes of an event and window dates as b'YYYYMMDD', returns False if the event can be ruled out
+
+	The event bytes are as indexed by indexEvents, beginning with the newline that ends
+	its BEGIN:VEVENT line.
+	"""
+	event = _topLevel(event)
+	if b'\nRECURRENCE-ID' in event:
+		return True
+	summary = _propertyValue(event, b'SUMMARY')
+	if summary is None or b'-' not in summary:
+		return False
+
+	dtStart = _propertyValue(event, b'DTSTART')
+	if dtStart is None or not dtStart[:8].isdigit():
+		return True # left to the tokenizer
+	if dtStart[:8] > windowEnd:
+		return False
+	rule = _propertyValue(event, b'RRULE')
+	if rule is None:
+		return dtStart[:8] >= windowStart
+	until = rule.find(b'UNTIL=')
+	if until != -1 and rule[until+6:until+14].isdigit():
+		return rule[until+6:until+14] >= windowStart
+	return True
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _topLevel(event):
+	"""returns the bytes of an event with any nested components (e.g. VALARM) removed"""
+	if event.find(b'\nBEGIN:') == -1:
+		return event
+	parts = []
+	depth, pos, topStart = 0, 0, 0
+	while True:
+		begin = event.find(b'\nBEGIN:', pos)
+		end = event.find(b'\nEND:', pos)
+		if begin != -1 and (end == -1 or begin < end):
+			if depth == 0:
+				parts.append(event[topStart:begin])
+			depth += 1
+			pos = begin+1
+		elif end != -1:
+			if depth == 0:
+				return event # unbalanced, left as is
+			depth -= 1
+			pos = end+1
+			if depth == 0:
+				# the top level resumes at the line after the component's END line
+				topStart = event.find(b'\n', pos)
+				if topStart == -1:
+					topStart = len(event)
+		else:
+			break
+	if depth:
+		return event
+	parts.append(event[topStart:])
+	return b''.join(parts)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _propertyValue(event, name):
+	"""returns the unfolded value of the first property of the given name in the event bytes, or None"""
+	pos = event.find(b'\n'+name)
+	# skip longer property names beginning the same way
+	while pos != -1 and event[pos+1+len(name):pos+2+len(name)] not in (b':', b';'):
+		pos = event.find(b'\n'+name, pos+1)
+	if pos == -1:
+		return None
+	# folded continuation lines begin with a space or tab
+	end = event.find(b'\n', pos+1)
+	while end != -1 and event[end+1:end+2] in (b' ', b'\t'):
+		end = event.find(b'\n', end+1)
+	line = event[pos+1:] if end == -1 else event[pos+1:end]
+	if b'\n' in line:
+		line = line.replace(b'\r\n ', b'').replace(b'\r\n\t', b'').replace(b'\n ', b'').replace(b'\n\t', b'')
+	colon = line.find(b':')
+	if colon == -1:
+		return None
+	return line[colon+1:].rstrip(b'\r')
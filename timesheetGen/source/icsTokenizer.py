@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+"""ICS Tokenizer
+
+This module reads a calendar file (.ics) as a stream of RFC 5545 content lines and
+yields one VEVENT at a time. Folded continuation lines (lines beginning with a
+space or tab) are joined back onto the line they continue, and property parameters
+such as the TZID in:
+	DTSTART;TZID=America/New_York:20210830T140000
+are separated from the property value.
+
+The file is read in a single pass and only the properties of the event currently
+being read are held in memory, so very large calendar exports can be processed
+without loading the whole file.
+
+Each event is yielded as a dictionary mapping an upper-case property name to a list
+of (parameters, value) tuples, in the order they appear in the event. Properties of
+components nested inside an event (such as VALARM) are skipped.
+
+The following functions are available:
+	* unfoldLines - given an open (.ics) file, yields unfolded content lines
+	* parseContentLine - given a content line, returns (name, parameters, value)
+	* iterEvents - given an open (.ics) file, yields each VEVENT as a dictionary
+	* iterEventLines - given an open (.ics) file, yields the unparsed lines of each VEVENT
+	* parseEventLines - given the lines of a VEVENT, returns it as a dictionary
+	* eventStamp - given the lines of a VEVENT, returns its UID key and change stamp
+	* firstValue - given an event, returns the (parameters, value) of a property
+	* unescapeText - given a TEXT property value, returns it with escapes removed
+"""
+
+def unfoldLines(icsFile):
+	"""Given an open (.ics) file, yields logical content lines with folded lines joined"""
+	pieces = []
+	for rawLine in icsFile:
+		rawLine = rawLine.rstrip('\r\n')
+		if rawLine[:1] in (' ', '\t'):
+			# continuation of the previous line; the leading whitespace is not content
+			if pieces:
+				pieces.append(rawLine[1:])
+			continue
+		if pieces:
+			yield ''.join(pieces)
+		pieces = [rawLine] if rawLine else []
+	if pieces:
+		yield ''.join(pieces)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def parseContentLine(line):
+	"""Given an unfolded content line, returns (name, parameters, value) or None if malformed
+
+	Parameter names are upper-cased and parameter values are returned as strings with
+	any surrounding double quotes removed. A parameter with several values keeps them
+	comma separated.
+	"""
+	colon = line.find(':')
+	if colon == -1:
+		return None
+	semi = line.find(';')
+	if semi == -1 or semi > colon:
+		return line[:colon].upper(), {}, line[colon+1:]
+
+	# parameters present, which may contain quoted ':' and ';' characters
+	name = line[:semi].upper()
+	params = {}
+	i, n = semi + 1, len(line)
+	while i < n:
+		eq = line.find('=', i)
+		if eq == -1:
+			return None
+		paramName = line[i:eq].upper()
+		i = eq + 1
+		values = []
+		while True:
+			if i < n and line[i] == '"':
+				close = line.find('"', i+1)
+				if close == -1:
+					return None
+				values.append(line[i+1:close])
+				i = close + 1
+			else:
+				j = i
+				while j < n and line[j] not in ',;:':
+					j += 1
+				values.append(line[i:j])
+				i = j
+			if i < n and line[i] == ',':
+				i += 1
+				continue
+			break
+		params[paramName] = ','.join(values)
+		if i >= n:
+			return None
+		if line[i] == ':':
+			return name, params, line[i+1:]
+		i += 1 # skip ';' to next parameter
+	return None
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def iterEvents(icsFile):
+	"""Given an open (.ics) file, yields each VEVENT as a dictionary of properties
+
+	Each dictionary maps a property name to a list of (parameters, value) tuples.
+	"""
+	for lines in iterEventLines(icsFile):
+		yield parseEventLines(lines)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def iterEventLines(icsFile):
+	"""Given an open (.ics) file, yields the unparsed content lines inside each VEVENT
+
+	The BEGIN:VEVENT and END:VEVENT lines are not included, while the lines of any
+	nested components are.
+	"""
+	lines = None
+	nested = 0 # depth of components (e.g. VALARM) nested inside the current event
+	for line in unfoldLines(icsFile):
+		if lines is None:
+			if line[:6].upper() == 'BEGIN:' and line[6:].strip().upper() == 'VEVENT':
+				lines = []
+			continue
+		head = line[:6].upper()
+		if head == 'BEGIN:':
+			nested += 1
+		elif head[:4] == 'END:':
+			if nested:
+				nested -= 1
+			elif line[4:].strip().upper() == 'VEVENT':
+				yield lines
+				lines = None
+				continue
+		lines.append(line)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def parseEventLines(lines):
+	"""Given the content lines of a VEVENT, returns it as a dictionary of properties"""
+	event = {}
+	nested = 0
+	for line in lines:
+		parsed = parseContentLine(line)
+		if parsed is None:
+			continue
+		name, params, value = parsed
+		if name == 'BEGIN':
+			nested += 1
+		elif name == 'END':
+			if nested:
+				nested -= 1
+		elif not nested:
+			event.setdefault(name, []).append((params, value))
+	return event
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def eventStamp(lines):
+	"""Given the content lines of a VEVENT, returns ((UID, RECURRENCE-ID), stamp)
+
+	Only the identifying lines are parsed. The stamp is (SEQUENCE, LAST-MODIFIED), or
+	None if the event has no LAST-MODIFIED to tell whether it changed.
+	"""
+	uid, recID, sequence, lastMod = '', '', '0', None
+	nested = 0
+	for line in lines:
+		head = line[:3].upper()
+		if head == 'BEG':
+			nested += 1
+		elif head == 'END':
+			nested -= 1
+		elif not nested and head in ('UID', 'REC', 'SEQ', 'LAS'):
+			parsed = parseContentLine(line)
+			if parsed is None:
+				continue
+			name, params, value = parsed
+			if name == 'UID':
+				uid = value.strip()
+			elif name == 'RECURRENCE-ID':
+				recID = value.strip()
+			elif name == 'SEQUENCE':
+				sequence = value.strip()
+			elif name == 'LAST-MODIFIED':
+				lastMod = value.strip()
+	if lastMod is None:
+		return (uid, recID), None
+	return (uid, recID), (sequence, lastMod)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def firstValue(event, name):
+	"""Given an event dictionary and property name, returns its first (parameters, value) or None"""
+	props = event.get(name)
+	if props:
+		return props[0]
+	return None
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def unescapeText(value):
+	"""Given a TEXT property value, returns it with RFC 5545 backslash escapes removed"""
+	if '\\' not in value:
+		return value
+	out = []
+	i, n = 0, len(value)
+	while i < n:
+		ch = value[i]
+		if ch == '\\' and i+1 < n:
+			nxt = value[i+1]
+			out.append('\n' if nxt in 'nN' else nxt)
+			i += 2
+		else:
+			out.append(ch)
+			i += 1
+	return ''.join(out)
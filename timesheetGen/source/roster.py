@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+"""Tutor and Student Roster
+
+This module holds the names read from a file (.txt) of names, formatted as:
+	tutor:
+	[tutor's last name], [tutor's first name]
+	students:
+	[student's last name], [student's first name], [sport], [course]
+	...
+where the sport and course columns are optional. Students are indexed by last name,
+so the full name of a session's student is found without scanning the whole list.
+
+Students who share a last name are told apart by the sport and course of the
+session, compared with the sport and course given for each of them in the file.
+Since the summary's fields after the student's last name are written in either
+order, each of the student's sport and course may match either of the session's.
+If the session still matches more than one of them, the last name alone is used
+and a warning is printed, so the session can be checked by hand. The last names
+already warned about are kept by the caller, such as once per timesheet, since the
+Roster itself is shared by every timesheet made in the process.
+
+A names file is read by loadRoster(), which checks its format and parses it in one
+pass. The roster is kept for the rest of the process and only read again if the
+file's size or modification time changes.
+
+The following are available:
+	* loadRoster - given a names file, returns its Roster, or None if badly formatted
+	* clearRosters - forgets all loaded rosters
+	* Student - record of a single student's names
+	* Roster - the tutor and students, indexed by last name
+	* Roster.fromLines - given the tutor line and student lines of a names file, returns a Roster
+	* Roster.fullName - given a last name, optionally sport and course and a set of last names
+	  already warned about, returns the full name
+"""
+
+import os
+import threading
+from collections import namedtuple
+
+Student = namedtuple('Student', ['lastName', 'firstName', 'sport', 'course'])
+
+# loaded rosters by absolute path: (size, mtime, Roster or None)
+_rosters = {}
+_lock = threading.Lock()
+
+def loadRoster(namesFile):
+	"""Given a file (.txt) of names, returns its Roster, or None if the file isn't formatted correctly
+
+	Parameters
+	~~~~~~~~~~
+	namesFile : str
+		The input (.txt) file of tutor's and students' names, as described above
+
+	Returns
+	~~~~~~~
+	Roster or None
+		The tutor and students of the file, None if the "tutor:" or "students:" line is missing
+	"""
+	path = os.path.abspath(namesFile)
+	stat = os.stat(path)
+	with _lock:
+		entry = _rosters.get(path)
+		if entry is None or not (entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns):
+			entry = (stat.st_size, stat.st_mtime_ns, _readRoster(path))
+			_rosters[path] = entry
+		return entry[2]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def clearRosters():
+	"""Forgets all loaded rosters so names files are read from disk on next use"""
+	with _lock:
+		_rosters.clear()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _readRoster(path):
+	"""reads and checks a names file in a single pass, returning a Roster or None"""
+	tutorLine, studentLines = None, None
+	with open(path, 'r') as nfile:
+		for line in nfile:
+			if studentLines is not None:
+				# every line after "students:" is a student
+				studentLines.append(line)
+			elif line.strip() == 'tutor:':
+				tutorLine = next(nfile, '')
+			elif line.strip() == 'students:':
+				studentLines = []
+	if tutorLine is None or studentLines is None:
+		return None
+	return Roster.fromLines(tutorLine, studentLines)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class Roster:
+	"""A tutor and their students, indexed by the students' last names
+
+	Attributes
+	~~~~~~~~~~
+	tutor : Student
+		The tutor's names, with empty sport and course
+	students : list
+		Every student as a Student, in the order of the names file
+	"""
+
+	def __init__(self, tutor, students):
+		self.tutor = tutor
+		self.students = students
+		self._index = {} # last name -> [Student]
+		for stu in students:
+			self._index.setdefault(stu.lastName, []).append(stu)
+
+	@classmethod
+	def fromLines(cls, tutorLine, studentLines):
+		"""Given the tutor's line and students' lines of a names file, returns a Roster"""
+		return cls(_line2student(tutorLine), [_line2student(line) for line in studentLines if line.strip()])
+
+	def fullName(self, lastName, sport='', course='', warned=None):
+		"""Given a student's last name and optionally the session's sport and course, returns the full name
+
+		The last name is returned unchanged if it isn't in the roster, or if it is shared
+		by students that the sport and course don't tell apart. A warning is then printed,
+		unless the last name is in the set warned, to which it is added.
+		"""
+		matches = self._index.get(lastName)
+		if not matches:
+			return lastName
+		if len(matches) > 1:
+			matches = [stu for stu in matches if _fieldsMatch((stu.sport, stu.course), (sport, course))]
+			if not len(matches) == 1:
+				if warned is None or lastName not in warned:
+					if warned is not None:
+						warned.add(lastName)
+					print("Warning: more than one student with the last name", lastName,
+						"matches the session; the last name alone is used in the timesheet.")
+				return lastName
+		return matches[0].firstName+' '+matches[0].lastName
+
+	def __len__(self):
+		return len(self.students)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _line2student(line):
+	"""Given a line of 'last, first[, sport[, course]]', returns a Student"""
+	fields = [field.strip() for field in line.split(',')]
+	fields += ['']*(4-len(fields))
+	return Student(fields[0], fields[1], fields[2], fields[3])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _fieldsMatch(given, sessionValues):
+	"""Returns True if the sport and course from the names file may be those of the session, in either order
+
+	given and sessionValues are pairs of (sport, course); an empty value is unknown and
+	pairs with any value of the other.
+	"""
+	given = [value.lower() for value in given if value]
+	session = [value.lower() for value in sessionValues if value]
+	return (len([value for value in given if value not in session]) <= 2-len(session)
+		and len([value for value in session if value not in given]) <= 2-len(given))
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""Tutoring Session Record
+
+This module defines the Session record passed between calendar2csv.py,
+csv2timesheet.py and repFormFiller.py. A session holds its real starting and ending
+datetime objects together with the student, sport and course names taken from the
+meeting summary:
+	tutorLastName-studentLastName-Course-Sport
+
+Sessions are tuples with no per-instance dictionary, and the student, sport and
+course strings are interned, so the many sessions of a long window share a single
+copy of each name. Dates and times are only formatted as strings when written out.
+
+The following are available:
+	* Session - record of a single session
+	* Session.fromRow - given a (.csv) row of strings, returns a Session
+	* Session.toRow - returns the session as a (.csv) row of strings
+"""
+
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+class Session(namedtuple('Session', ['start', 'end', 'student', 'sport', 'course'])):
+	"""A single tutoring session
+
+	Attributes
+	~~~~~~~~~~
+	start : datetime
+		The starting date and time of the session
+	end : datetime or None
+		The ending date and time of the session, None if the meeting has no times
+	student : str
+		The student's last name, or names separated by '/'
+	sport : str
+		The student's sport
+	course : str
+		The course of the session
+	"""
+	__slots__ = ()
+
+	def __new__(cls, start, end, student, sport, course):
+		return super().__new__(cls, start, end, sys.intern(student), sys.intern(sport), sys.intern(course))
+
+	@classmethod
+	def fromRow(cls, row):
+		"""Given a row formatted as [date, student, sport, course, sTime, eTime], returns a Session"""
+		start = datetime.strptime(row[0]+' '+row[4], '%m/%d/%Y %H:%M')
+		if row[5].strip() and not row[5] == 'NaN':
+			end = datetime.strptime(row[0]+' '+row[5], '%m/%d/%Y %H:%M')
+		else:
+			end = None
+		return cls(start, end, row[1].strip(), row[2].strip(), row[3].strip())
+
+	def toRow(self):
+		"""Returns the session as a list of strings: [date, student, sport, course, sTime, eTime]"""
+		return [self.dateStr, self.student, self.sport, self.course, self.startStr, self.endStr]
+
+	@property
+	def dateStr(self):
+		"""The session date formatted as M/D/YYYY"""
+		return str(self.start.month)+'/'+str(self.start.day)+'/'+str(self.start.year)
+
+	@property
+	def startStr(self):
+		"""The starting time formatted as HH:MM"""
+		return '%02d:%02d' % (self.start.hour, self.start.minute)
+
+	@property
+	def endStr(self):
+		"""The ending time formatted as HH:MM, or NaN if the meeting has no times"""
+		if self.end is None:
+			return 'NaN'
+		return '%02d:%02d' % (self.end.hour, self.end.minute)
+
+	@property
+	def minutes(self):
+		"""The length of the session in minutes, from the times' hours and minutes as in sessionTable.py"""
+		if self.end is None:
+			return 0
+		days = self.end.toordinal() - self.start.toordinal()
+		return days*1440 + (self.end.hour - self.start.hour)*60 + self.end.minute - self.start.minute
+
+	@property
+	def hours(self):
+		"""The length of the session in hours"""
+		if self.end is None:
+			return 0.0
+		return (self.end - self.start).total_seconds() / 3600
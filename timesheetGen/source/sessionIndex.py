@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Session Index
+
+This module keeps the sessions of a calendar file (.ics) in memory for a span of dates,
+sorted by their starting date and time, so the sessions of any window within the span
+are found by binary search and returned as a slice, without reading the calendar again.
+A running total of hours is kept alongside, so the number of sessions and total hours
+of a window take two lookups however many sessions it holds.
+
+It is used by the GUI to preview the sessions of the chosen dates as they change.
+
+The following are available:
+	* SessionIndex - the sorted sessions of a calendar over a span of dates
+	* indexFor - given an index (or None), calendar and window, returns an index covering it
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from datetime import datetime, time, timedelta
+from calendar2csv import calendar2sessions
+
+SPAN_MARGIN = timedelta(days=183) # dates either side of the window indexed, so nearby windows are covered
+
+class SessionIndex:
+	"""The sessions of a calendar over a span of dates, sorted by start so any window within is a slice
+
+	Parameters
+	~~~~~~~~~~
+	inputICS : str
+		The input Google calendar (.ics) file
+	spanStart : date
+		The first date indexed
+	spanEnd : date
+		The last date indexed
+	useCache : bool, optional
+		When True, the parsed calendar is read from and saved to the cache (see icsCache.py).
+		The span's recurrence expansions are never saved, so they don't replace those of
+		the window last generated
+	"""
+
+	def __init__(self, inputICS, spanStart, spanEnd, useCache=True):
+		self.inputICS = inputICS
+		self.spanStart = spanStart
+		self.spanEnd = spanEnd
+		self.fileStamp = _fileStamp(inputICS)
+		self.sessions = calendar2sessions(inputICS, _dateStr(spanStart), _dateStr(spanEnd), useCache, keepExpansions=False)
+		self._starts = [session.start for session in self.sessions]
+		self._hours = list(accumulate((session.hours for session in self.sessions), initial=0.0))
+
+	def covers(self, inputICS, startDate, endDate):
+		"""Returns True if the window of the given calendar is within the index and the file is unchanged"""
+		return (os.path.abspath(inputICS) == os.path.abspath(self.inputICS)
+			and self.spanStart <= startDate and endDate <= self.spanEnd
+			and _fileStamp(inputICS) == self.fileStamp)
+
+	def window(self, startDate, endDate):
+		"""Given starting and ending dates, returns the sessions between them sorted by date and time"""
+		lo, hi = self._bounds(startDate, endDate)
+		return self.sessions[lo:hi]
+
+	def totals(self, startDate, endDate):
+		"""Given starting and ending dates, returns (number of sessions, total hours) between them"""
+		lo, hi = self._bounds(startDate, endDate)
+		return hi-lo, self._hours[hi]-self._hours[lo]
+
+	def _bounds(self, startDate, endDate):
+		"""returns the slice of sessions from the start of startDate to the end of endDate"""
+		lo = bisect_left(self._starts, datetime.combine(startDate, time.min))
+		hi = bisect_right(self._starts, datetime.combine(endDate, time.max))
+		return lo, max(lo, hi)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def indexFor(index, inputICS, startDate, endDate, useCache=True):
+	"""Given an index or None, a calendar file and window dates, returns an index covering the window
+
+	The given index is returned if it already covers the window; otherwise the calendar
+	is indexed from SPAN_MARGIN before startDate to SPAN_MARGIN after endDate.
+	"""
+	if index is not None and index.covers(inputICS, startDate, endDate):
+		return index
+	return SessionIndex(inputICS, startDate-SPAN_MARGIN, endDate+SPAN_MARGIN, useCache)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _fileStamp(inputICS):
+	"""returns (size, modification time) of a file"""
+	stat = os.stat(inputICS)
+	return (stat.st_size, stat.st_mtime_ns)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _dateStr(dateObj):
+	"""returns a date formatted as MM/DD/YYYY"""
+	return str(dateObj.month)+'/'+str(dateObj.day)+'/'+str(dateObj.year)
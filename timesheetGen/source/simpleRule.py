@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""Simple Recurrence Rules
+
+This module expands the recurrence rules that almost every tutoring meeting uses by
+date arithmetic instead of dateutil, such as:
+	FREQ=WEEKLY;WKST=SU;UNTIL=20211026T171500;BYDAY=TU,TH
+	FREQ=WEEKLY;COUNT=7
+	FREQ=DAILY;INTERVAL=2;UNTIL=20211026
+A rule is simple if it is DAILY or WEEKLY with only INTERVAL, UNTIL or COUNT (not both),
+WKST and, for WEEKLY rules, BYDAY without numeric prefixes. The occurrences of such a
+rule fall on fixed days of each week (or period of days), so the first occurrence of a
+window is found by jumping straight to the window's week rather than walking every
+occurrence since DTSTART. Any other rule is left to dateutil.
+
+The occurrences are the same as dateutil's, including its handling of:
+	* an UNTIL date without a time, which is taken as midnight, so a meeting later on
+	  the UNTIL date isn't included
+	* a DTSTART whose weekday isn't in BYDAY, which isn't itself an occurrence
+	* weeks beginning on WKST (Monday by default) when counting an INTERVAL of weeks
+See benchmarks/ruleCheck.py for the comparison with dateutil.
+
+The following are available:
+	* SimpleRule - the occurrences of a simple rule, iterated like a dateutil rrule
+	* parseSimpleRule - given DTSTART and an RRULE value, returns a SimpleRule or None
+"""
+
+from datetime import datetime, timedelta
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+SIMPLE_PARTS = {'FREQ', 'INTERVAL', 'UNTIL', 'COUNT', 'WKST', 'BYDAY'}
+
+class SimpleRule:
+	"""The occurrences of a DAILY or WEEKLY rule at fixed days of each period
+
+	Parameters
+	~~~~~~~~~~
+	start : datetime
+		The DTSTART of the rule
+	period : int
+		The days between the starts of periods, 1 for DAILY and 7 for WEEKLY, times INTERVAL
+	offsets : list
+		The sorted days of the period on which the rule occurs, counted from the first
+		day of the period
+	periodStart : date
+		The first day of the period holding DTSTART
+	until : datetime, optional
+		The last datetime an occurrence may fall on
+	count : int, optional
+		The number of occurrences
+	"""
+
+	def __init__(self, start, period, offsets, periodStart, until=None, count=None):
+		self.start = start
+		self.period = period
+		self.offsets = offsets
+		self.periodStart = periodStart
+		self.until = until
+		self.count = count
+		# occurrences in the first period, which may begin before DTSTART
+		self._firstOffsets = [offset for offset in offsets if periodStart + timedelta(days=offset) >= start.date()]
+
+	def __iter__(self):
+		return self.xafter(self.start, inc=True)
+
+	def xafter(self, dt, inc=False):
+		"""Yields the occurrences from dt on (including dt if inc), as dateutil's rrule.xafter"""
+		# the period holding dt, or the first period if dt is before it
+		first = max(0, (dt.date() - self.periodStart).days // self.period)
+		startTime = self.start.time()
+		num = first
+		while True:
+			offsets = self._firstOffsets if num == 0 else self.offsets
+			# occurrences before this period, for COUNT
+			index = 0 if num == 0 else len(self._firstOffsets) + (num-1)*len(self.offsets)
+			periodStart = self.periodStart + timedelta(days=num*self.period)
+			for offset in offsets:
+				if self.count is not None and index >= self.count:
+					return
+				occurrence = datetime.combine(periodStart + timedelta(days=offset), startTime)
+				index += 1
+				if self.until is not None and occurrence > self.until:
+					return
+				if occurrence > dt or (inc and occurrence == dt):
+					yield occurrence
+			num += 1
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def parseSimpleRule(start, ruleText):
+	"""Given the DTSTART datetime and RRULE value of a meeting, returns a SimpleRule or None if it isn't simple"""
+	try:
+		parts = dict(part.split('=', 1) for part in ruleText.strip().upper().split(';') if part)
+	except ValueError:
+		return None
+	if not set(parts) <= SIMPLE_PARTS or ('UNTIL' in parts and 'COUNT' in parts):
+		return None
+	freq = parts.get('FREQ')
+	if freq not in ('DAILY', 'WEEKLY') or (freq == 'DAILY' and 'BYDAY' in parts):
+		return None
+
+	interval = parts.get('INTERVAL', '1')
+	count = parts.get('COUNT')
+	if not interval.isdigit() or int(interval) < 1 or (count is not None and not count.isdigit()):
+		return None
+	until = None
+	if 'UNTIL' in parts:
+		until = _untilDate(parts['UNTIL'])
+		if until is None:
+			return None
+	wkst = WEEKDAYS.get(parts.get('WKST', 'MO'))
+	if wkst is None:
+		return None
+
+	if freq == 'DAILY':
+		return SimpleRule(start, int(interval), [0], start.date(), until, None if count is None else int(count))
+	if 'BYDAY' in parts:
+		days = set()
+		for day in parts['BYDAY'].split(','):
+			if day not in WEEKDAYS:
+				return None # numeric prefixes such as 1MO, or not a weekday
+			days.add(WEEKDAYS[day])
+	else:
+		days = {start.weekday()}
+	offsets = sorted((day - wkst) % 7 for day in days)
+	weekStart = start.date() - timedelta(days=(start.weekday() - wkst) % 7)
+	return SimpleRule(start, 7*int(interval), offsets, weekStart, until, None if count is None else int(count))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _untilDate(value):
+	"""returns an UNTIL value as a datetime, a date alone being midnight, or None if not a plain date or date-time"""
+	try:
+		if len(value) == 8:
+			return datetime.strptime(value, '%Y%m%d')
+		if len(value) == 15:
+			return datetime.strptime(value, '%Y%m%dT%H%M%S')
+	except ValueError:
+		pass
+	return None
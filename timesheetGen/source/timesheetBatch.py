@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""CATS Timesheet Batch Generator
+
+This script generates the timesheets of many tutors at once for the same window of
+dates, running timesheetGen() for each tutor in a pool of worker processes. Each
+tutor is a job made up of a calendar file (.ics) and an optional file (.txt) of
+names, and a job that fails is reported without stopping the others.
+
+command line usage:
+	python3 timesheetBatch.py jobs -s [startDate] -e [endDate] -o [outDir] -j [numJobs]
+	- where jobs is either:
+		* a manifest file (.csv) with one job per line formatted as:
+			inputICS,namesFile
+		  where namesFile may be left empty, and lines starting with '#' are skipped.
+		  Relative paths are taken from the manifest's directory.
+		* a directory of calendar files (.ics), each paired with the names file (.txt)
+		  of the same name if present, e.g. smith.ics and smith.txt
+	- [startDate] and [endDate] are the window as for timesheetGen.py
+	- [outDir] is an optional directory for the output files, the runpath by default
+	- [numJobs] is the optional number of worker processes, the number of cores by default
+
+Every timesheet is named as by timesheetGen.py. Timesheets for the same window share
+a name without a names file, or when tutors share a last name, so each job is given
+its own output directory named after its calendar file (with a number added if
+calendars from different directories share a name).
+
+requires:
+	* the same files as timesheetGen.py, along with timesheetGen.py itself
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dateWindow import resolveWindow
+
+def timesheetBatch(jobs, startDate='01/01/1970', endDate='12/31/9999', outDir='.', numJobs=None):
+	"""Given a list of (inputICS, namesFile) jobs, generates a timesheet for each and returns the results
+
+	Parameters
+	~~~~~~~~~~
+	jobs : list
+		Pairs of (inputICS, namesFile), where namesFile is 'none' if not used
+	startDate : str, optional
+		The starting date of window to extract meetings from, formatted as: MM/DD/YYYY
+	endDate : str, optional
+		The ending date of window to extract meetings from, formatted as: MM/DD/YYYY
+	outDir : str, optional
+		The directory the output documents are saved in
+	numJobs : int, optional
+		The number of worker processes, the number of cores if not given
+
+	Returns
+	~~~~~~~
+	list
+		A result for each job: (inputICS, output document or None, error message or None)
+	"""
+	results = []
+	with ProcessPoolExecutor(max_workers=numJobs) as pool:
+		futures = {}
+		for (inputICS, namesFile), jobDir in zip(jobs, _jobDirs(jobs, outDir)):
+			futures[pool.submit(_runJob, inputICS, startDate, endDate, namesFile, jobDir)] = inputICS
+		for future in as_completed(futures):
+			try:
+				results.append(future.result())
+			except Exception as err: # worker process itself failed
+				results.append((futures[future], None, repr(err)))
+	return results
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _jobDirs(jobs, outDir):
+	"""returns a distinct output directory for each job, named after its calendar file"""
+	jobDirs, used = [], set()
+	for inputICS, namesFile in jobs:
+		name = os.path.splitext(os.path.basename(inputICS))[0]
+		jobName, num = name, 1
+		while jobName.lower() in used: # case-insensitive file systems
+			num += 1
+			jobName = name+'_'+str(num)
+		used.add(jobName.lower())
+		jobDirs.append(os.path.join(outDir, jobName))
+	return jobDirs
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _runJob(inputICS, startDate, endDate, namesFile, outDir):
+	"""runs timesheetGen() for one job in a worker process, returning (inputICS, outDoc, error)"""
+	from timesheetGen import timesheetGen
+	try:
+		os.makedirs(outDir, exist_ok=True)
+		outDoc = timesheetGen(inputICS, startDate, endDate, namesFile, outDir=outDir)
+		return (inputICS, outDoc, None)
+	except Exception:
+		return (inputICS, None, traceback.format_exc().strip().split('\n')[-1])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def readJobs(source):
+	"""Given a manifest file (.csv) or directory of calendars, returns a list of (inputICS, namesFile)"""
+	jobs = []
+	if os.path.isdir(source):
+		for fname in sorted(os.listdir(source)):
+			if fname.lower().endswith('.ics'):
+				inputICS = os.path.join(source, fname)
+				namesFile = os.path.splitext(inputICS)[0]+'.txt'
+				if not os.path.exists(namesFile):
+					namesFile = 'none'
+				jobs.append((inputICS, namesFile))
+	else:
+		baseDir = os.path.dirname(os.path.abspath(source))
+		with open(source, 'r') as manifest:
+			for row in csv.reader(manifest):
+				if len(row) == 0 or not row[0].strip() or row[0].strip().startswith('#'):
+					continue
+				inputICS = os.path.join(baseDir, row[0].strip())
+				namesFile = 'none'
+				if len(row) > 1 and row[1].strip() and not row[1].strip() == 'none':
+					namesFile = os.path.join(baseDir, row[1].strip())
+				jobs.append((inputICS, namesFile))
+	return jobs
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _printSummary(results, elapsed):
+	"""prints the outcome of each job followed by totals"""
+	failed = [res for res in results if res[2] is not None]
+	print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+	for inputICS, outDoc, error in sorted(results, key=lambda res: res[0]):
+		if error is None:
+			print("OK      ", inputICS, "->", outDoc)
+		else:
+			print("FAILED  ", inputICS, ":", error)
+	print("Timesheets created: ", len(results)-len(failed), "of", len(results))
+	print("Failed: ", len(failed))
+	print("Total time: ", round(elapsed, 2), "s")
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument(
+		"jobs",
+		type=str,
+		help="A manifest (.csv) of inputICS,namesFile lines or a directory of (.ics) and (.txt) files"
+	)
+	argParser.add_argument(
+		"-s", "--startDate",
+		nargs='?', # 0 or 1 argument
+		type=str,
+		default="01/01/1970",
+		help="The starting date of window to extract meetings from, formatted as: MM/DD/YYYY"
+	)
+	argParser.add_argument(
+		"-e", "--endDate",
+		nargs='?',
+		type=str,
+		default="12/31/9999",
+		help="The ending date of window to extract meetings from, formatted as: MM/DD/YYYY"
+	)
+	argParser.add_argument(
+		"-o", "--outDir",
+		type=str,
+		default='.',
+		help="The directory to save the output documents in"
+	)
+	argParser.add_argument(
+		"-j", "--numJobs",
+		type=int,
+		default=None,
+		help="The number of worker processes, the number of cores by default"
+	)
+	args = argParser.parse_args()
+
+	endDate = resolveWindow(args.startDate, args.endDate)
+
+	jobs = readJobs(args.jobs)
+	if len(jobs) == 0:
+		print("No calendar (.ics) files found in: ", args.jobs)
+		sys.exit(1)
+
+	startTime = time.perf_counter()
+	results = timesheetBatch(jobs, args.startDate, endDate, args.outDir, args.numJobs)
+	_printSummary(results, time.perf_counter()-startTime)
+	if any(res[2] is not None for res in results):
+		sys.exit(1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
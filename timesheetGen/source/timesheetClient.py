@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+"""CATS Timesheet Client
+
+This script sends a timesheet request to a running timesheet server (started with
+timesheetGen.py --serve) and prints the output file it created. Since the server
+already holds the template, names files and parsed calendars in memory, this is
+much faster than running timesheetGen.py for each timesheet.
+
+command line usage:
+	python3 timesheetClient.py inputICS -s [startDate] -e [endDate] -n [namesFile] -t -c --stream --mmap --socket [socketPath]
+	- the arguments are the same as those of timesheetGen.py
+	- [socketPath] is the Unix socket the server listens on, if not the default
+	- The optional flag --shutdown stops the server instead (inputICS is not needed)
+
+The output files are saved in the directory the client is run from.
+
+requires:
+	* the following files to be in the runpath of timesheetClient.py:
+		* timesheetServer.py
+		* dateWindow.py
+"""
+
+import os
+import sys
+import argparse
+from timesheetServer import sendRequest
+from dateWindow import resolveWindow
+
+def main():
+	argParser = argparse.ArgumentParser()
+	argParser.add_argument(
+		"inputICS",
+		nargs='?',
+		type=str,
+		help="The input Google Calendar (.ics) file"
+	)
+	argParser.add_argument(
+		"-s", "--startDate",
+		nargs='?',
+		type=str,
+		default="01/01/1970",
+		help="The starting date of window to extract meetings from, formatted as: MM/DD/YYYY"
+	)
+	argParser.add_argument(
+		"-e", "--endDate",
+		nargs='?',
+		type=str,
+		default="12/31/9999",
+		help="The ending date of window to extract meetings from, formatted as: MM/DD/YYYY"
+	)
+	argParser.add_argument(
+		"-n", "--namesFile",
+		type=str,
+		default='none',
+		help="""The input (.txt) file of tutor's name followed by students' names"""
+	)
+	argParser.add_argument(
+		"-t", "--onlyTutor",
+		action='store_true',
+		help="""Include only the meetings of the tutor named in the namesFile"""
+	)
+	argParser.add_argument(
+		"-c", "--csv",
+		action='store_true',
+		help="""An option flag to save meeting info to a (.csv) file"""
+	)
+	argParser.add_argument(
+		"--stream",
+		action='store_true',
+		help="""Write the document as the meetings are read, for very large timesheets"""
+	)
+	argParser.add_argument(
+		"--mmap",
+		dest='scan',
+		action='store_true',
+		help="""Memory-map the calendar and only decode the events that could fall within the window"""
+	)
+	argParser.add_argument(
+		"--socket",
+		type=str,
+		default=None,
+		help="""The Unix socket the server listens on"""
+	)
+	argParser.add_argument(
+		"--shutdown",
+		action='store_true',
+		help="""Stop the server"""
+	)
+	args = argParser.parse_args()
+
+	if args.shutdown:
+		request = {'command': 'shutdown'}
+	else:
+		if args.inputICS is None:
+			argParser.error("the following arguments are required: inputICS")
+		# the server runs elsewhere, so paths are sent absolute and output comes back here
+		namesFile = args.namesFile if args.namesFile == 'none' else os.path.abspath(args.namesFile)
+		request = {'inputICS': os.path.abspath(args.inputICS), 'startDate': args.startDate,
+			'endDate': resolveWindow(args.startDate, args.endDate), 'namesFile': namesFile,
+			'keepCSV': args.csv, 'stream': args.stream, 'scan': args.scan, 'onlyTutor': args.onlyTutor, 'outDir': os.getcwd()}
+
+	try:
+		reply = sendRequest(request, args.socket)
+	except OSError as err:
+		print("Couldn't reach the timesheet server (start it with: python3 timesheetGen.py --serve): ", err)
+		sys.exit(1)
+	if not reply.get('ok'):
+		print("The server couldn't create the timesheet: ", reply.get('error'))
+		sys.exit(1)
+	if args.shutdown:
+		print("Server shut down")
+	else:
+		print("Output file created: ", reply['outFile'])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+	main()
@@ -8,7 +8,7 @@ output timesheet, the meetings should have their summary (meeting name) formatte
 	tutorLastName-studentLastName-Course-Sport
 
 command line usage:
-	python3 timesheetGen.py inputICS -s [startDate] -e [endDate] -n [namesFile] -c
+	python3 timesheetGen.py inputICS -s [startDate] -e [endDate] -n [namesFile] -t -c --stream --mmap --profile [profFile]
 	- where inputICS is the user provided (.ics) file
 	- [startDate] and [endDate] are optional arguments to provide the starting
 	  and ending dates of the window to be parsed
@@ -23,15 +23,34 @@ command line usage:
 		students:
 		[student's last name], [student's first name]
 		...
-	- The optional flag -c can be included to keep the generated (.csv) file that
-	  is otherwise deleted after use
+	- The optional flag -t includes only the meetings of the tutor named in the
+	  [namesFile], leaving out other tutors' meetings in a shared calendar
+	- The optional flag --no-cache parses the calendar again instead of using the
+	  parse cached from a previous run (see icsCache.py)
+	- The optional flag --stream writes the document as the meetings are read instead
+	  of building it in memory first, for very large timesheets
+	- The optional flag --mmap memory-maps the calendar and only decodes the events
+	  that could fall within the window, for very large calendars (see icsIndex.py)
+	- The optional flag --profile prints the time taken by each stage (tokenizing,
+	  expansion, reconciling overrides, building rows, saving) with the numbers of
+	  events and sessions; if [profFile] is given, cProfile statistics are also saved
+	  to it for viewing with pstats or snakeviz
+	- The optional flag -c can be included to also save the meetings to a (.csv)
+	  file, which is otherwise not written
+
+server usage:
+	python3 timesheetGen.py --serve [socketPath]
+	- keeps running with the template, names files and parsed calendars in memory,
+	  generating timesheets for requests sent with timesheetClient.py (see
+	  timesheetServer.py); [socketPath] is the Unix socket to listen on
 
 The output file will be named dependent on the input dates and the file of names
 if included. If the namesFile is included, the output file will be named:
 	[tutor's last name]_timesheet_[startDate]_to_[endDate].docx
 Otherwise the output file will be named:
 	timesheet_[startDate]_to_[endDate].docx
-**Note: the [namesFile] option won't work properly if students share a last name
+**Note: students who share a last name are told apart by the sport and course given
+  for them in the [namesFile] (optional columns after the first name)
 
 example use:
 	python3 timesheetGen.py infile.ics -s 08/15/2021
@@ -42,18 +61,32 @@ from 08/15/2021. The only output file generated will be:
 requires:
 	* the following files to be in the runpath of timesheetGen.py:
 		* calendar2csv.py
+		* icsTokenizer.py
+		* icsIndex.py
+		* simpleRule.py
+		* icsCache.py
+		* session.py
+		* roster.py
 		* csv2timesheet.py
+		* templateCache.py
+		* docxStream.py
+		* stageTimer.py
+		* sessionTable.py
+		* dateWindow.py
+		* timesheetServer.py (for --serve)
 		* timesheetTemplate.docx
 """
 
 import os
 import argparse
-from calendar2csv import calendar2csv as cal2csv
-from calendar2csv import dateStr2Obj
-from csv2timesheet import csv2timesheet as csv2ts
-from datetime import *
+from calendar2csv import calendar2sessions as cal2sessions
+from calendar2csv import sessions2csv, windowName
+from dateWindow import resolveWindow
+from csv2timesheet import sessions2timesheet as sessions2ts
+from roster import loadRoster
+from stageTimer import profiled
 
-def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFile='none', keepCSV=False):
+def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFile='none', keepCSV=False, useCache=True, outDir='.', stream=False, scan=False, onlyTutor=False):
 	"""Given an input Google Calendar file, returns a (.docx) file in CATS timesheet format
 	
 	Parameters
@@ -72,7 +105,17 @@ def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFi
 			[student's last name], [student's first name]
 			...
 	keepCSV: bool, optional
-		An optional flag that when True, the generated (.csv) file will not be deleted
+		An optional flag that when True, the meetings are also saved to a (.csv) file
+	useCache: bool, optional
+		When True, the parsed calendar is read from and saved to the cache (see icsCache.py)
+	outDir: str, optional
+		The directory the output files are saved in
+	stream: bool, optional
+		When True, the document is written as the sessions are read (see csv2timesheet.py)
+	scan: bool, optional
+		When True, only the events that could fall within the window are decoded (see icsIndex.py)
+	onlyTutor: bool, optional
+		When True, only the meetings of the tutor named in namesFile are included
 	
 	Returns
 	~~~~~~~
@@ -80,18 +123,24 @@ def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFi
 		A MSWord document of the meetings in CATS timesheet format
 	"""
 
-	inCSV = cal2csv(inputICS, startDate, endDate)
-	csv2ts(inCSV, namesFile)
-	if not keepCSV:
-		if os.path.exists(inCSV):
-			os.remove(inCSV)
-	else:
+	# sessions are passed to the timesheet in memory; the (.csv) file is only written if kept
+	# other tutors' meetings are left out before their recurrences are expanded
+	tutor = None
+	if onlyTutor and not namesFile == 'none':
+		roster = loadRoster(namesFile)
+		if roster is not None:
+			tutor = roster.tutor.lastName
+	sessions = cal2sessions(inputICS, startDate, endDate, useCache, scan, tutor)
+	if keepCSV:
+		inCSV = sessions2csv(sessions, os.path.join(outDir, "meetings"+windowName(startDate, endDate)+'.csv'))
 		print("Output file created: ", inCSV)
+	return sessions2ts(sessions, namesFile, "timesheet"+windowName(startDate, endDate)+'.docx', outDir, stream)
 
 def main():
 	argParser = argparse.ArgumentParser()
 	argParser.add_argument(
 		"inputICS",
+		nargs='?',
 		type=str,
 		help="The input Google Calendar (.ics) file"
 	)
@@ -115,23 +164,60 @@ def main():
 		default='none',
 		help="""The input (.txt) file of tutor's name followed by students' names"""
 	)
+	argParser.add_argument(
+		"-t", "--onlyTutor",
+		action='store_true',
+		help="""Include only the meetings of the tutor named in the namesFile"""
+	)
 	argParser.add_argument(
 		"-c", "--csv",
 		action='store_true',
 		help="""An option flag to save meeting info to a (.csv) file"""
 	)
-	#TODO: option to delete (.csv) file after run
+	argParser.add_argument(
+		"--no-cache",
+		dest='useCache',
+		action='store_false',
+		help="""Parse the calendar again instead of using the cached parse from a previous run"""
+	)
+	argParser.add_argument(
+		"--stream",
+		action='store_true',
+		help="""Write the document as the meetings are read, for very large timesheets"""
+	)
+	argParser.add_argument(
+		"--mmap",
+		dest='scan',
+		action='store_true',
+		help="""Memory-map the calendar and only decode the events that could fall within the window"""
+	)
+	argParser.add_argument(
+		"--profile",
+		nargs='?',
+		const='',
+		default=None,
+		metavar='PROFFILE',
+		help="""Print the time taken by each stage, and save cProfile statistics to PROFFILE if given"""
+	)
+	argParser.add_argument(
+		"--serve",
+		nargs='?',
+		const='',
+		default=None,
+		metavar='SOCKET',
+		help="""Keep running and serve timesheet requests from timesheetClient.py on the Unix socket SOCKET"""
+	)
 	args = argParser.parse_args()
 
-	startDate = dateStr2Obj(args.startDate)
-	# if startDate is set and not endDate, set endDate to 2 weeks past the startDate
-	if (not args.startDate == '01/01/1970' and args.endDate == '12/31/9999'):
-		endDate = startDate + timedelta(days=13) # 13 to exclude 3rd instance of starting day
-	else:
-		endDate = dateStr2Obj(args.endDate)
-	endDate = str(endDate.month)+'/'+str(endDate.day)+'/'+str(endDate.year)
+	if args.serve is not None:
+		from timesheetServer import serve
+		serve(args.serve or None)
+		return
+	if args.inputICS is None:
+		argParser.error("the following arguments are required: inputICS")
 
-	timesheetGen(args.inputICS, args.startDate, endDate, args.namesFile, args.csv)
+	endDate = resolveWindow(args.startDate, args.endDate)
+	profiled(args.profile, timesheetGen, args.inputICS, args.startDate, endDate, args.namesFile, args.csv, args.useCache, stream=args.stream, scan=args.scan, onlyTutor=args.onlyTutor)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 if __name__ == "__main__":
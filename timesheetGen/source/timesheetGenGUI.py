@@ -24,15 +24,16 @@ command line usage:
 		students:
 		student's last name, student's first name
 		...
-	- The optional flag -c can be included to keep the generated (.csv) file that
-	  is otherwise deleted after use
+	- The optional flag -c can be included to also save the meetings to a (.csv)
+	  file, which is otherwise not written
 
 The output file will be named dependent on the input dates and the file of names
 if included. If the namesFile is included, the output file will be named:
 	[tutor's last name]_timesheet_[startDate]_to_[endDate].docx
 Otherwise the output file will be named:
 	timesheet_[startDate]_to_[endDate].docx
-**Note: the [namesFile] option won't work properly if students share a last name
+**Note: students who share a last name are told apart by the sport and course given
+  for them in the [namesFile] (optional columns after the first name)
 
 example use:
 	python3 timesheetGen.py infile.ics -s 08/15/2021
@@ -43,20 +44,37 @@ from 08/15/2021. The only output file generated will be:
 requires:
 	* the following files to be in the runpath of timesheetGen.py:
 		* calendar2csv.py
+		* icsTokenizer.py
+		* icsIndex.py
+		* simpleRule.py
+		* icsCache.py
+		* session.py
+		* roster.py
 		* csv2timesheet.py
+		* templateCache.py
+		* docxStream.py
+		* stageTimer.py
+		* sessionTable.py
+		* dateWindow.py
+		* sessionIndex.py
 		* timesheetTemplate.docx
 """
 
 import os
 import argparse
-from calendar2csv import calendar2csv as cal2csv
+from calendar2csv import calendar2sessions as cal2sessions
+from calendar2csv import sessions2csv, windowName
 from calendar2csv import dateStr2Obj
-from csv2timesheet import csv2timesheet as csv2ts
-from csv2timesheet import checkFormat
+from csv2timesheet import sessions2timesheet as sessions2ts
+from roster import loadRoster
+from stageTimer import ProgressTimer, Cancelled, usingTimer
+from sessionIndex import indexFor
 from datetime import *
+import queue
+import threading
 from tkinter import *
+from tkinter import ttk
 from tkinter.filedialog import askopenfilename
-from tkcalendar import DateEntry
 
 def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFile='none', keepCSV=False):
 	"""Given an input Google Calendar file, returns a (.docx) file in CATS timesheet format
@@ -77,7 +95,7 @@ def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFi
 			[student's last name], [student's first name]
 			...
 	keepCSV: bool, optional
-		An optional flag that when True, the generated (.csv) file will not be deleted
+		An optional flag that when True, the meetings are also saved to a (.csv) file
 	
 	Returns
 	~~~~~~~
@@ -86,13 +104,12 @@ def timesheetGen(inputICS, startDate='01/01/1970', endDate='12/31/9999', namesFi
 		run directory. The name of the output document is returned.
 	"""
 
-	inCSV = cal2csv(inputICS, startDate, endDate)
-	outDoc = csv2ts(inCSV, namesFile)
-	if not keepCSV:
-		if os.path.exists(inCSV): 
-			os.remove(inCSV)
-	else:
+	# sessions are passed to the timesheet in memory; the (.csv) file is only written if kept
+	sessions = cal2sessions(inputICS, startDate, endDate)
+	if keepCSV:
+		inCSV = sessions2csv(sessions, "meetings"+windowName(startDate, endDate)+'.csv')
 		print("Output (.csv) file created: ", inCSV)
+	outDoc = sessions2ts(sessions, namesFile, "timesheet"+windowName(startDate, endDate)+'.docx')
 	return outDoc # return name of output document
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -109,15 +126,84 @@ def _chooseFile(tkEntry, ftype):
 	if os.path.exists(fname):
 		message.configure(text="") # reset notification message
 		if not ftype == ".ics":
-			if not checkFormat(fname):
+			# the roster is loaded here and kept, so generating doesn't read the file again
+			if loadRoster(fname) is None:
 				message.configure(text="The given namesFile doesn't have the correct format and won't be used.")
 	else:
 		message.configure(text="Please choose a valid "+txt)
+	_refreshPreview()
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def _setEndDate(startDate, endCal):
 	"""sets the Ending Date Entry to 14 days past the Starting Date"""
 	endCal.set_date(startDate + timedelta(days=13)) # 13 to exclude 3rd instance of starting day)
+	_refreshPreview()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _refreshPreview():
+	"""shows the sessions of the chosen dates in the preview, indexing the calendar on a thread if needed"""
+	global previewBuilder
+	if endCal is None:
+		return # the date entries aren't created until the window is first drawn
+	inputICS = _gatherVars()[0]
+	if not os.path.exists(inputICS):
+		_showPreview(None, None, None)
+		return
+	startDate, endDate = startCal.get_date(), endCal.get_date()
+	if previewIndex is not None and previewIndex.covers(inputICS, startDate, endDate):
+		# the dates are within the sessions kept in memory, so no file is read
+		_showPreview(previewIndex, startDate, endDate)
+	elif previewBuilder is None or not previewBuilder.is_alive():
+		previewTotals.configure(text="Reading sessions...")
+		previewBuilder = threading.Thread(target=_buildPreview, args=(inputICS, startDate, endDate), daemon=True)
+		previewBuilder.start()
+		root.after(POLL_MS, _pollPreview)
+	# otherwise the preview is refreshed for the latest dates once the index being built is done
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _buildPreview(inputICS, startDate, endDate):
+	"""indexes the sessions of the calendar around the given dates on a thread, passing the index by queue"""
+	try:
+		previewEvents.put(('index', indexFor(None, inputICS, startDate, endDate)))
+	except Exception as err:
+		previewEvents.put(('error', str(err)))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _pollPreview():
+	"""on the Tk thread, picks up the built index and refreshes the preview, polling again with after() until then"""
+	global previewIndex
+	try:
+		kind, value = previewEvents.get_nowait()
+	except queue.Empty:
+		root.after(POLL_MS, _pollPreview)
+		return
+	if kind == 'index':
+		previewIndex = value
+		_refreshPreview() # dates may have changed while indexing
+	else:
+		previewTotals.configure(text="Sessions could not be read:   "+value)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _showPreview(index, startDate, endDate):
+	"""fills the preview table with the sessions of the window, and shows their count and total hours"""
+	previewTree.delete(*previewTree.get_children())
+	if index is None:
+		previewTotals.configure(text="")
+		return
+	namesFile = _gatherVars()[3]
+	roster = loadRoster(namesFile) if os.path.exists(namesFile) else None
+	warned = set() # shared last names warned about in this refresh
+	for session in index.window(startDate, endDate)[:PREVIEW_ROWS]:
+		student = session.student
+		if roster is not None:
+			student = roster.fullName(session.student, session.sport, session.course, warned)
+		previewTree.insert('', END, values=(session.dateStr, student, session.sport, session.course,
+			session.startStr, session.endStr, round(session.hours, 2)))
+	count, hours = index.totals(startDate, endDate)
+	text = "Sessions: "+str(count)+"      Total Hours: "+str(round(hours, 2))
+	if count > PREVIEW_ROWS:
+		text += "      (first "+str(PREVIEW_ROWS)+" shown)"
+	previewTotals.configure(text=text)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def _gatherVars():
@@ -139,13 +225,69 @@ def _gatherVars():
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def _generateTimeSheet():
-	"""gathers variables and generates time sheet with timesheetGen()"""
+	"""gathers variables and starts generating the time sheet with timesheetGen() on a worker thread"""
+	global worker
+	if worker is not None and worker.is_alive():
+		return # already generating
+	if endCal is None:
+		return # the date entries aren't created until the window is first drawn
 	args = _gatherVars()
 	if not os.path.exists(args[0]):
 		message.configure(text="Please choose a valid calendar (.ics) file")
-	else:
-		outputDoc = timesheetGen(args[0],args[1],args[2],args[3])
-		message.configure(text="Output file created:   "+outputDoc)
+		return
+	cancelEvent.clear()
+	progress.configure(value=0)
+	cancelBut.configure(state=NORMAL)
+	message.configure(text="Generating timesheet...")
+	worker = threading.Thread(target=_runWorker, args=(args,), daemon=True)
+	worker.start()
+	root.after(POLL_MS, _pollWorker)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _runWorker(args):
+	"""runs timesheetGen() on the worker thread, passing its stages and result to the Tk thread by queue"""
+	timer = ProgressTimer(lambda stage: workerEvents.put(('stage', stage)), cancelEvent)
+	try:
+		with usingTimer(timer):
+			outputDoc = timesheetGen(args[0],args[1],args[2],args[3])
+		workerEvents.put(('done', outputDoc))
+	except Cancelled:
+		workerEvents.put(('cancelled', None))
+	except Exception as err:
+		workerEvents.put(('error', str(err)))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _pollWorker():
+	"""on the Tk thread, shows the worker's progress and result, polling again with after() until it's done"""
+	try:
+		while True:
+			kind, value = workerEvents.get_nowait()
+			if kind == 'stage':
+				if value in STAGES:
+					progress.configure(value=STAGES.index(value))
+					message.configure(text="Generating timesheet:   "+STAGE_TEXT.get(value, value))
+				continue
+			cancelBut.configure(state=DISABLED)
+			if kind == 'done':
+				progress.configure(value=len(STAGES))
+				message.configure(text="Output file created:   "+value)
+			elif kind == 'cancelled':
+				progress.configure(value=0)
+				message.configure(text="Timesheet generation cancelled")
+			else:
+				progress.configure(value=0)
+				message.configure(text="Timesheet could not be generated:   "+value)
+			return
+	except queue.Empty:
+		pass
+	root.after(POLL_MS, _pollWorker)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _cancelGeneration():
+	"""asks the worker to stop, which it does at its next stage, event expanded or row filled"""
+	if worker is not None and worker.is_alive():
+		cancelEvent.set()
+		message.configure(text="Cancelling...")
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Main GUI loop
@@ -153,9 +295,31 @@ def _generateTimeSheet():
 defaults = ["", "01/01/1970", "12/31/9999", "none"]
 inputICS, startDate, endDate, namesFile = defaults[0], defaults[1], defaults[2], defaults[3]
 
+# generation runs on a worker thread; its stages and result are passed back through workerEvents
+# and picked up on the Tk thread every POLL_MS, so the window keeps responding
+STAGES = ['tokenize', 'reconcile', 'expand', 'sort', 'template', 'paginate', 'rows', 'save']
+STAGE_TEXT = {'tokenize': "reading calendar", 'reconcile': "checking moved meetings",
+	'expand': "finding sessions", 'sort': "sorting sessions", 'template': "loading template",
+	'paginate': "creating pages", 'rows': "filling in sessions", 'save': "saving document"}
+POLL_MS = 50
+workerEvents = queue.Queue()
+cancelEvent = threading.Event()
+worker = None
+
+# sessions previewed for the chosen dates, sliced from an index of the calendar kept in memory
+PREVIEW_COLUMNS = ['Date', 'Student', 'Sport', 'Course', 'Start', 'End', 'Hours']
+PREVIEW_ROWS = 500 # most sessions listed in the preview; the totals count all of them
+previewEvents = queue.Queue()
+previewIndex = None
+previewBuilder = None
+
+# date entries, created once the window is drawn; events handled while drawing it find them None
+startCal = None
+endCal = None
+
 # create Tkinter GUI
 root = Tk()
-root.geometry('800x270')
+root.geometry('800x560')
 root.title("CATS Timesheet Generator")
 
 # first row
@@ -171,22 +335,17 @@ lab1.pack(side=LEFT)
 ent1.pack(side=LEFT, expand=YES, fill=X)
 fileBut.pack(side=RIGHT)
 
-# second row
+# second row - its date entry is added once the window is drawn
 row2 = Frame(root)
 lab2 = Label(row2, width=18, text="Starting Date", anchor='w')
-startCal = DateEntry(row2, width=10)
-startCal.bind('<<DateEntrySelected>>', lambda dateHandler: _setEndDate(startCal.get_date(), endCal))
 row2.pack(side=TOP, fill=X, padx=5, pady=5)
 lab2.pack(side=LEFT)
-startCal.pack(side=LEFT, padx=10, pady=10)
 
-# third row
+# third row - its date entry is added once the window is drawn
 row3 = Frame(root)
 lab3 = Label(row3, width=18, text="Ending Date", anchor='w')
-endCal = DateEntry(row3, width=10)
 row3.pack(side=TOP, fill=X, padx=5, pady=5)
 lab3.pack(side=LEFT)
-endCal.pack(side=LEFT, padx=10, pady=10)	
 
 # fourth row
 row4 = Frame(root)
@@ -204,9 +363,46 @@ file2But.pack(side=RIGHT)
 message = Label(root, text="")
 message.pack(side=BOTTOM, padx=5, pady=10)
 
-# timesheetGen button - will show up in GUI above message
+# progress of generation and cancel button - will show up in GUI above message
+row5 = Frame(root)
+progress = ttk.Progressbar(row5, orient=HORIZONTAL, mode='determinate', maximum=len(STAGES))
+cancelBut = Button(row5, text="Cancel", state=DISABLED, command=_cancelGeneration)
+row5.pack(side=BOTTOM, fill=X, padx=5, pady=5)
+progress.pack(side=LEFT, expand=YES, fill=X)
+cancelBut.pack(side=RIGHT)
+
+# timesheetGen button - will show up in GUI above progress
 genBut = Button(root, text="Generate Timesheet", anchor='n')
 genBut.bind('<Button>', lambda genButHandler: _generateTimeSheet())
 genBut.pack(side=BOTTOM, padx=5, pady=5)
 
+# preview of the sessions in the chosen dates - packed last to fill the space left between rows and button
+row6 = Frame(root)
+previewTree = ttk.Treeview(row6, columns=PREVIEW_COLUMNS, show='headings', height=8)
+for col in PREVIEW_COLUMNS:
+	previewTree.heading(col, text=col)
+	previewTree.column(col, width=160 if col == 'Student' else 90, anchor='w' if col == 'Student' else 'center')
+previewScroll = Scrollbar(row6, orient=VERTICAL, command=previewTree.yview)
+previewTree.configure(yscrollcommand=previewScroll.set)
+previewTotals = Label(row6, text="", anchor='w')
+row6.pack(side=TOP, fill=BOTH, expand=YES, padx=5, pady=5)
+previewTotals.pack(side=BOTTOM, fill=X)
+previewScroll.pack(side=RIGHT, fill=Y)
+previewTree.pack(side=LEFT, fill=BOTH, expand=YES)
+
+# draw the window before importing tkcalendar, which loads babel and is the slowest import of the GUI;
+# python-docx and dateutil aren't imported until a timesheet is first generated or previewed
+root.update()
+from tkcalendar import DateEntry
+startCal = DateEntry(row2, width=10)
+startCal.bind('<<DateEntrySelected>>', lambda dateHandler: _setEndDate(startCal.get_date(), endCal))
+startCal.pack(side=LEFT, padx=10, pady=10)
+endCal = DateEntry(row3, width=10)
+endCal.bind('<<DateEntrySelected>>', lambda dateHandler: _refreshPreview())
+# typed dates are read once entered, added after the DateEntry's own handlers that check them
+for dateEntry in (startCal, endCal):
+	dateEntry.bind('<FocusOut>', lambda dateHandler: _refreshPreview(), add='+')
+	dateEntry.bind('<Return>', lambda dateHandler: _refreshPreview(), add='+')
+endCal.pack(side=LEFT, padx=10, pady=10)
+
 root.mainloop()
\ No newline at end of file
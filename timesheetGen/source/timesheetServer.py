@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""CATS Timesheet Server
+
+This module keeps a timesheet generator running in the background, listening on a
+Unix domain socket, so that generating a timesheet doesn't pay for starting Python,
+importing python-docx and dateutil, parsing the template or parsing the calendar
+each time. The template (see templateCache.py), rosters (see roster.py) and parsed
+calendars (see icsCache.py) stay in the server's memory between requests, and are
+only read again when their files change, so a repeated request costs only the
+expansion of the window's meetings and the writing of the document.
+
+The server is started with:
+	python3 timesheetGen.py --serve [socketPath]
+from the directory holding "timesheetTemplate.docx", and requests are sent to it with
+timesheetClient.py. Requests are handled one at a time.
+
+Each request and reply is a single line of JSON. A request holds the arguments of
+timesheetGen(), with absolute paths:
+	{"inputICS": ..., "startDate": ..., "endDate": ..., "namesFile": ..., "keepCSV": ...,
+	 "stream": ..., "scan": ..., "onlyTutor": ..., "outDir": ...}
+and is answered with:
+	{"ok": true, "outFile": [output document]}
+or:
+	{"ok": false, "error": [error message]}
+The requests {"command": "ping"} and {"command": "shutdown"} check that the server
+is running and stop it.
+
+The following functions are available:
+	* serve - given a socket path, serves timesheet requests until shut down
+	* sendRequest - given a socket path and request, returns the server's reply
+	* SOCKET_PATH - the socket used if none is given
+"""
+
+import os
+import sys
+import json
+import socket
+import tempfile
+import traceback
+
+SOCKET_PATH = os.environ.get('CATS_SOCKET', os.path.join(tempfile.gettempdir(), 'catsTimesheet-'+str(os.getuid() if hasattr(os, 'getuid') else 0)+'.sock'))
+MAX_REQUEST_BYTES = 64 * 1024
+
+def serve(socketPath=None):
+	"""Given a socket path, serves timesheet requests on it until a shutdown request
+
+	Parameters
+	~~~~~~~~~~
+	socketPath : str, optional
+		The Unix domain socket to listen on, SOCKET_PATH if not given
+	"""
+	import socketserver
+	from timesheetGen import timesheetGen
+
+	if socketPath is None:
+		socketPath = SOCKET_PATH
+	if not hasattr(socketserver, 'UnixStreamServer'):
+		print("The server needs Unix domain sockets, which aren't available on this system.")
+		sys.exit(1)
+	if os.path.exists(socketPath):
+		if _isServing(socketPath):
+			print("A server is already running on: ", socketPath)
+			sys.exit(1)
+		os.remove(socketPath) # left behind by a server that didn't shut down
+
+	class Handler(socketserver.StreamRequestHandler):
+		def handle(self):
+			try:
+				request = json.loads(self.rfile.readline(MAX_REQUEST_BYTES))
+				reply = _handleRequest(request, timesheetGen)
+			except Exception:
+				reply = {'ok': False, 'error': traceback.format_exc().strip().split('\n')[-1]}
+			self.wfile.write(json.dumps(reply).encode('utf-8')+b'\n')
+			if reply.get('shutdown'):
+				# shutdown() waits for serve_forever() to return, so it can't be called from its own thread
+				self.server._stopRequested = True
+
+	with socketserver.UnixStreamServer(socketPath, Handler) as server:
+		server._stopRequested = False
+		os.chmod(socketPath, 0o600) # only the user starting the server can send it requests
+		print("Serving timesheet requests on: ", socketPath)
+		try:
+			while not server._stopRequested:
+				server.handle_request()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			if os.path.exists(socketPath):
+				os.remove(socketPath)
+	print("Server stopped")
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _handleRequest(request, timesheetGen):
+	"""given a request dictionary, runs it and returns the reply dictionary"""
+	command = request.get('command', 'timesheet')
+	if command == 'ping':
+		return {'ok': True}
+	if command == 'shutdown':
+		return {'ok': True, 'shutdown': True}
+	if not command == 'timesheet':
+		return {'ok': False, 'error': "Unknown command: "+str(command)}
+
+	outDir = request.get('outDir', '.')
+	os.makedirs(outDir, exist_ok=True)
+	outFile = timesheetGen(request['inputICS'], request.get('startDate', '01/01/1970'), request.get('endDate', '12/31/9999'),
+		request.get('namesFile', 'none'), request.get('keepCSV', False), outDir=outDir, stream=request.get('stream', False), scan=request.get('scan', False), onlyTutor=request.get('onlyTutor', False))
+	return {'ok': True, 'outFile': os.path.abspath(outFile)}
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def sendRequest(request, socketPath=None, timeout=None):
+	"""Given a request dictionary and socket path, sends the request to the server and returns its reply
+
+	Raises OSError if no server is listening on the socket.
+	"""
+	if socketPath is None:
+		socketPath = SOCKET_PATH
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+		sock.settimeout(timeout)
+		sock.connect(socketPath)
+		sock.sendall(json.dumps(request).encode('utf-8')+b'\n')
+		with sock.makefile('rb') as replyFile:
+			reply = replyFile.readline()
+	if not reply:
+		return {'ok': False, 'error': "The server closed the connection without replying"}
+	return json.loads(reply)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _isServing(socketPath):
+	"""returns True if a server answers on the socket"""
+	try:
+		return sendRequest({'command': 'ping'}, socketPath, timeout=2).get('ok', False)
+	except (OSError, ValueError):
+		return False